@@ -0,0 +1,259 @@
+"""
+Retrieval benchmark suite for the engine layer.
+
+Runs offline: only the Retriever is exercised and the LLM reranker is never
+imported, so no Gemini calls are made. Measures
+
+  - cold start in a fresh interpreter (imports, model load, PersistentClient open,
+    first query),
+  - query embedding throughput at several batch sizes,
+  - search latency versus n_results for each retrieval backend,
+  - peak RSS after each phase; every backend runs in its own interpreter, so
+    its peak covers only the model and that backend's index,
+
+and writes the results as JSON with sorted keys and fixed rounding, so two
+runs can be compared with a plain diff.
+
+    python benchmarks/run_benchmarks.py --output benchmarks/results.json
+    python benchmarks/run_benchmarks.py --backends numpy --repeat 50
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+# Fix path to allow importing from 'src' root
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(proj_root)
+
+import numpy as np
+import pandas as pd
+
+from evaluations.run_evaluation import git_commit, latency_summary
+
+BACKENDS = ("chroma", "numpy", "multivector")
+BATCH_SIZES = (1, 8, 32, 128)
+N_RESULTS = (15, 50, 100, 200)
+REPEAT = 20
+QUERIES_PATH = os.path.join(proj_root, "data", "given_datasets", "train.csv")
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "results.json")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_queries(path=QUERIES_PATH):
+    """Unique benchmark queries: the labelled training queries."""
+    return list(dict.fromkeys(pd.read_csv(path)["Query"].dropna()))
+
+
+def cold_start_probe():
+    """
+    Time each cold start step in this (fresh) interpreter.
+
+    Returns:
+        dict: Seconds spent importing, loading the model, opening the client and
+              answering the first query, plus the peak RSS afterwards
+    """
+    timings = {}
+    start = time.perf_counter()
+    import chromadb
+    from chromadb.utils import embedding_functions
+    from src.engine import retriever as retriever_module
+    timings["import_s"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    embed_func = embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=retriever_module.EMBEDDING_MODEL
+    )
+    embed_func(["warm-up"])
+    timings["model_load_s"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    client = chromadb.PersistentClient(path=retriever_module.DB_PATH)
+    client.get_collection(name=retriever_module.COLLECTION_NAME)
+    timings["client_open_s"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    retriever = retriever_module.Retriever()
+    timings["retriever_init_s"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    retriever.search("Java developer with strong collaboration skills", n_results=15)
+    timings["first_query_s"] = time.perf_counter() - mark
+
+    timings["total_s"] = time.perf_counter() - start
+    result = {name: round(seconds, 3) for name, seconds in timings.items()}
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_probe(*args):
+    """Run this script with probe arguments in a fresh interpreter and return its JSON result."""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), *args],
+                               cwd=proj_root, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    # The probe prints its JSON result as the last line, after any library output
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def bench_cold_start():
+    """Run the cold start probe in a fresh interpreter so nothing is already imported or cached."""
+    return run_probe("--probe-cold-start")
+
+
+def backend_probe(backend, hybrid=False, repeat=REPEAT):
+    """
+    Benchmark one backend in this (fresh) interpreter.
+
+    Returns:
+        dict: init_s, latency_ms (see bench_search) and the peak RSS after
+              initialising the retriever and after searching
+    """
+    from src.engine.retriever import Retriever
+
+    queries = load_queries()
+    start = time.perf_counter()
+    retriever = Retriever(backend=backend, hybrid=hybrid)
+    init_s = time.perf_counter() - start
+    rss = {"after_init": peak_rss_mb()}
+
+    query_embeddings = retriever.embed_func(queries)
+    latency = bench_search(retriever, queries, query_embeddings, repeat=repeat)
+    rss["after_search"] = peak_rss_mb()
+    return {"init_s": round(init_s, 3), "latency_ms": latency, "peak_rss_mb": rss}
+
+
+def bench_backend(backend, hybrid=False, repeat=REPEAT):
+    """Run the backend probe in a fresh interpreter, so its peak RSS is not an earlier backend's."""
+    args = ["--probe-backend", backend, "--repeat", str(repeat)]
+    return run_probe(*args, *(["--hybrid"] if hybrid else []))
+
+
+def bench_embedding(embed_func, queries, batch_sizes=BATCH_SIZES, repeat=3):
+    """
+    Query embedding throughput per batch size, bypassing the query cache.
+
+    Returns:
+        dict: batch size -> {"ms_per_batch", "queries_per_second"} (best of repeat)
+    """
+    report = {}
+    for batch_size in batch_sizes:
+        # Cycle the queries to fill large batches; suffixes keep every text distinct
+        batch = [f"{queries[i % len(queries)]} #{i}" for i in range(batch_size)]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            embed_func(batch)
+            best = min(best, time.perf_counter() - start)
+        report[str(batch_size)] = {
+            "ms_per_batch": round(best * 1000.0, 2),
+            "queries_per_second": round(batch_size / best, 1),
+        }
+    return report
+
+
+def bench_search(retriever, queries, query_embeddings, n_results_list=N_RESULTS, repeat=REPEAT):
+    """
+    Search latency (embedding excluded) per n_results for one retriever.
+
+    Returns:
+        dict: n_results -> latency summary in ms over repeat passes of every query
+    """
+    report = {}
+    for n_results in n_results_list:
+        # One untimed pass warms caches and lazily built structures
+        retriever.search_embedded(queries[:1], query_embeddings[:1], n_results=n_results)
+        samples = []
+        for _ in range(repeat):
+            for query, embedding in zip(queries, query_embeddings):
+                start = time.perf_counter()
+                retriever.search_embedded([query], [embedding], n_results=n_results)
+                samples.append(time.perf_counter() - start)
+        report[str(n_results)] = latency_summary(samples)
+    return report
+
+
+def run_benchmarks(backends=BACKENDS, hybrid=False, repeat=REPEAT, cold_start=True):
+    """Run every benchmark and return the report."""
+    report = {
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {"backends": list(backends), "hybrid": hybrid, "repeat": repeat,
+                   "batch_sizes": list(BATCH_SIZES), "n_results": list(N_RESULTS)},
+        "peak_rss_mb": {},
+    }
+
+    if cold_start:
+        print("Measuring cold start in a fresh interpreter...")
+        report["cold_start"] = bench_cold_start()
+
+    from chromadb.utils import embedding_functions
+    from src.engine.retriever import EMBEDDING_MODEL
+    report["peak_rss_mb"]["after_import"] = peak_rss_mb()
+
+    queries = load_queries()
+    print("Measuring embedding throughput...")
+    embed_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+    report["embedding"] = bench_embedding(embed_func, queries)
+    report["peak_rss_mb"]["after_embedding"] = peak_rss_mb()
+
+    report["search"] = {}
+    for backend in backends:
+        print(f"Benchmarking backend '{backend}' in a fresh interpreter...")
+        result = bench_backend(backend, hybrid=hybrid, repeat=repeat)
+        report["search"][backend] = result
+        if "peak_rss_mb" in result:
+            report["peak_rss_mb"][f"after_{backend}"] = result["peak_rss_mb"]["after_search"]
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the retrieval layer offline.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="Retrieval backends to benchmark")
+    parser.add_argument("--hybrid", action="store_true", help="Include BM25 fusion in search latency")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Timed passes over the queries per setting")
+    parser.add_argument("--skip-cold-start", action="store_true", help="Skip the fresh-interpreter cold start run")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="JSON file to write")
+    parser.add_argument("--probe-cold-start", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--probe-backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe_cold_start:
+        print(json.dumps(cold_start_probe(), sort_keys=True))
+        raise SystemExit(0)
+    if args.probe_backend:
+        print(json.dumps(backend_probe(args.probe_backend, hybrid=args.hybrid, repeat=args.repeat), sort_keys=True))
+        raise SystemExit(0)
+
+    report = run_benchmarks(args.backends, hybrid=args.hybrid, repeat=args.repeat,
+                            cold_start=not args.skip_cold_start)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+    print(json.dumps({key: report[key] for key in ("cold_start", "embedding", "peak_rss_mb") if key in report},
+                     indent=2, sort_keys=True))
+    for backend, result in report["search"].items():
+        if "error" in result:
+            print(f" - {backend}: {result['error']}")
+            continue
+        for n_results, summary in result["latency_ms"].items():
+            print(f" - {backend:6s} n_results={n_results:>3s} p50={summary['p50']}ms p95={summary['p95']}ms")
+    print(f"Saved to {args.output}")
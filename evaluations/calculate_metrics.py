@@ -1,8 +1,8 @@
 """
 Evaluation script to calculate metrics for the SHL Assessment Recommendation System.
 
-This script calculates the recall@10 metric by comparing the system's recommendations
-against a ground truth dataset of query-assessment pairs.
+This script calculates the mean recall@10 metric by comparing the system's recommendations
+against a ground truth dataset of query-assessment pairs, grouped by query.
 """
 import pandas as pd
 import requests
@@ -57,14 +57,33 @@ def extract_assessment_name(url):
     return name
 
 
+def build_slug_index(df):
+    """
+    Group the (Query, Assessment_url) rows by query.
+
+    Args:
+        df (pd.DataFrame): Dataset with one row per relevant assessment of a query
+
+    Returns:
+        dict: query -> set of normalized assessment names, in first-seen query order
+    """
+    index = {}
+    for query, url in zip(df['Query'], df['Assessment_url']):
+        name = extract_assessment_name(str(url))
+        if isinstance(query, str) and query.strip() and name:
+            index.setdefault(query, set()).add(name)
+    return index
+
+
 def calculate_metrics():
     """
     Calculate and print recall metrics for the recommendation system.
 
-    Tests the API with queries from the training dataset and checks if the
-    expected assessments appear in the top 10 recommendations.
+    Sends each unique query of the training dataset to the API once and
+    measures which fraction of its expected assessments appear in the top 10
+    recommendations (Recall@10), averaged over queries.
     """
-    print("Starting metrics calculation (normalized-slug + relaxed matching)...")
+    print("Starting metrics calculation (normalized-slug matching)...")
 
     # Validate dataset exists
     if not os.path.exists(DATASET_PATH):
@@ -78,26 +97,20 @@ def calculate_metrics():
         print(f"Error reading CSV: {e}")
         return
 
+    # One entry per unique query, holding the normalized names of all its labels
+    slug_index = build_slug_index(df)
     print()
-    print(f"Loaded {len(df)} test queries.")
+    print(f"Loaded {len(df)} labelled rows covering {len(slug_index)} unique queries.")
 
-    success_count = 0
+    recall_sum = 0.0
     processed = 0
+    session = requests.Session()
 
-    # Process each query in the dataset
-    for idx, row in df.iterrows():
-        query = row.get('Query', "")
-        target_url = str(row.get('Assessment_url', "")).strip()
-        target_name = extract_assessment_name(target_url)
-
-        # Skip invalid entries
-        if not query or not target_name:
-            print(f"Skipping row {idx+1}: missing query or target")
-            continue
-
+    # Process each unique query once
+    for idx, (query, target_names) in enumerate(slug_index.items()):
         # Query the API
         try:
-            response = requests.post(API_URL, json={"query": query}, timeout=50)
+            response = session.post(API_URL, json={"query": query}, timeout=50)
         except Exception as e:
             print(f"Request Error for query {idx+1}: {e}")
             continue
@@ -114,52 +127,33 @@ def calculate_metrics():
             print(f"Invalid JSON for query {idx+1}: {e}")
             continue
 
-        recommendations = data.get("recommended_assessments", [])
+        recommendations = data.get("recommended_assessments", [])[:10]
         processed += 1
 
-        rec_count = len(recommendations)
-        found = False
-        top_name = "None"
-
-        # Check if the target assessment is in the recommendations
-        for i, res in enumerate(recommendations):
-            res_url = str(res.get('url', '')).strip()
-            res_name = extract_assessment_name(res_url)
-
-            # Track the top recommendation for reporting
-            if i == 0:
-                top_name = res_name or "None"
-
-            # Use relaxed matching to handle URL variations
-            if res_name and (res_name == target_name or 
-                            res_name.endswith(target_name) or 
-                            target_name.endswith(res_name) or 
-                            target_name in res_name or 
-                            res_name in target_name):
-                found = True
-                break
+        # Set lookup of each recommendation against the query's label set
+        rec_names = [extract_assessment_name(str(r.get('url', '')).strip()) for r in recommendations]
+        found = target_names.intersection(rec_names)
+        recall = len(found) / len(target_names)
+        recall_sum += recall
 
         # Report results for this query
-        status = "Found" if found else "Missed"
-        print(f"Query {idx+1}: {status}  (recs={rec_count})")
+        print(f"Query {idx+1}: Recall@10 {recall:.2f}  ({len(found)}/{len(target_names)} found, recs={len(recommendations)})")
 
-        if not found:
+        missed = sorted(target_names - found)
+        if missed:
             # Detailed reporting for missed targets
-            print(f"   Expected name: {target_name}")
-            print(f"   Got Top name:  {top_name}")
+            for name in missed:
+                print(f"   Missed: {name}")
 
-            # Show the first 10 recommendations for analysis
-            for i, r in enumerate(recommendations[:10]):
+            # Show the recommendations for analysis
+            for i, (r, rn) in enumerate(zip(recommendations, rec_names)):
                 ru = str(r.get('url', '')).strip()
-                rn = extract_assessment_name(ru)
                 print(f"    {i+1}. raw=`{ru}`  name=`{rn}`")
             print("-" * 30)
-        else:
-            success_count += 1
 
     # Calculate and report the final recall score
     if processed > 0:
-        recall_score = success_count / processed
+        recall_score = recall_sum / processed
         print(f"Final Mean Recall@10: {recall_score:.2f} ({int(recall_score * 100)}%)  (based on {processed} processed queries)")
     else:
         print("No queries processed.")
@@ -1,16 +1,130 @@
+import argparse
+import asyncio
+import json
 import os
 import sys
+import time
 import pandas as pd
 
 # Fix path to allow importing from 'src' root
-sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from src.engine.retriever import Retriever
-from src.engine.llm_handler import LLMHandler
-
-
-def generate_csv():
-    """Generate predictions CSV file from test queries."""
+from src.engine.reranker import RERANKER, RERANKERS, SOURCE_ERROR, SOURCE_TIMEOUT, get_reranker
+
+OUTPUT_PATH = "final_submission_predictions.csv"
+# Finished queries are appended here as JSON lines, so an interrupted run can resume
+CHECKPOINT_PATH = "final_submission_predictions.checkpoint.jsonl"
+# Reranks in flight at once, and the rate they may be started at (requests/second)
+RERANK_CONCURRENCY = 4
+RERANK_RATE_LIMIT = 2.0
+
+
+class AsyncRateLimiter:
+    """Spaces coroutine starts evenly at a fixed rate."""
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate (float): Starts per second; 0 or less disables limiting
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """Sleep until the caller may start its next request."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def preview(query, width=60):
+    """Single-line prefix of a query for progress output."""
+    return " ".join(query.split())[:width]
+
+
+def load_checkpoint(path):
+    """
+    Read the queries already finished by an earlier run.
+
+    Returns:
+        dict: query -> list of recommended URLs
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line; that query is simply redone
+                continue
+            done[entry["query"]] = entry["urls"]
+    return done
+
+
+async def rerank_all(reranker, queries, candidates, checkpoint, concurrency, rate_limit):
+    """
+    Rerank every query concurrently, appending each result to the checkpoint as it finishes.
+
+    A query whose rerank failed (LLM error, rate limit or timeout) is not
+    checkpointed, so the next run retries it. A deliberate vector-order answer
+    (no LLM configured, or the LLM selected nothing) is kept like any other.
+
+    Returns:
+        dict: query -> list of recommended URLs for the queries that succeeded
+    """
+    slots = asyncio.Semaphore(max(concurrency, 1))
+    limiter = AsyncRateLimiter(rate_limit)
+    finished = {}
+
+    async def rerank_one(query, results):
+        async with slots:
+            await limiter.wait()
+            try:
+                # Use the reranker to select the top 10 most relevant assessments
+                final_recs, source = await reranker.arerank_with_source(query, results)
+            except Exception as e:
+                print(f"Rerank failed, will retry on the next run: {preview(query)} ({e})")
+                return
+
+        if source in (SOURCE_ERROR, SOURCE_TIMEOUT):
+            print(f"Rerank failed ({source}), will retry on the next run: {preview(query)}")
+            return
+
+        urls = [rec['url'] for rec in final_recs[:10]]
+        checkpoint.write(json.dumps({"query": query, "urls": urls}) + "\n")
+        checkpoint.flush()
+        finished[query] = urls
+        print(f"Done ({len(finished)}/{len(queries)}): {preview(query)}")
+
+    await asyncio.gather(*(rerank_one(q, c) for q, c in zip(queries, candidates)))
+    return finished
+
+
+def generate_csv(reranker_name=None, concurrency=RERANK_CONCURRENCY, rate_limit=RERANK_RATE_LIMIT,
+                 output_path=OUTPUT_PATH, checkpoint_path=CHECKPOINT_PATH, resume=True):
+    """
+    Generate predictions CSV file from test queries.
+
+    Duplicate queries are processed once, all remaining queries are embedded
+    and searched as one batch, and reranks run concurrently under a rate limit.
+    Each finished query is appended to a JSONL checkpoint, so rerunning after
+    an interruption only processes the queries that are still missing.
+
+    Args:
+        reranker_name (str): "llm" or "cross-encoder"; defaults to RERANKER
+        concurrency (int): Reranks in flight at once
+        rate_limit (float): Reranks started per second (0 disables limiting)
+        output_path (str): Submission CSV to write
+        checkpoint_path (str): JSONL file of finished queries
+        resume (bool): Reuse the queries already in the checkpoint
+    """
     # Load the unlabeled test set
     input_path = os.path.join(os.path.join(os.path.dirname(__file__), "..", "data", "given_datasets", "test.csv"))
     if not os.path.exists(input_path):
@@ -18,36 +132,45 @@ def generate_csv():
         return
 
     test_df = pd.read_csv(input_path)
+    unique_queries = list(dict.fromkeys(test_df['Query']))
+
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    predictions = load_checkpoint(checkpoint_path)
+    pending = [q for q in unique_queries if q not in predictions]
+
+    print(f"Generating predictions for {len(test_df)} test rows ({len(unique_queries)} unique queries, "
+          f"{len(unique_queries) - len(pending)} already in checkpoint)...")
+
+    if pending:
+        # Initialize Engine components
+        retriever = Retriever()
+        reranker = get_reranker(reranker_name)
+
+        # Get candidates with high recall for reranking, embedding every query in one batch
+        candidates = retriever.search_batch(pending, n_results=50)
+        # Narrow them to a balanced, non-redundant shortlist, as the API does
+        candidates = [retriever.diversify(results) for results in candidates]
+
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            predictions.update(asyncio.run(
+                rerank_all(reranker, pending, candidates, checkpoint, concurrency, rate_limit)
+            ))
+
+    missing = [q for q in unique_queries if q not in predictions]
+    if missing:
+        print(f"\n{len(missing)} queries failed; rerun to resume from `{checkpoint_path}`.")
+        return
 
-    # Initialize Engine components
-    retriever = Retriever()
-    llm = LLMHandler()
-
-    submission_rows = []
-
-    print(f"Generating predictions for {len(test_df)} test queries...")
-
-    # Process each query in the test set
-    for _, row in test_df.iterrows():
-        query_text = row['Query']
-        print(f"Processing: {query_text}")
-
-        # Get candidates with high recall for LLM reranking
-        candidates = retriever.search(query_text, n_results=50)
-
-        # Use LLM to select the top 10 most relevant assessments
-        final_recs = llm.rerank(query_text, candidates)[:10]
-
-        # Format results for output
-        for rec in final_recs:
-            submission_rows.append({
-                "Query": query_text,
-                "Assessment_url": rec['url']
-            })
+    # Format results for output, in test set order
+    submission_rows = [
+        {"Query": query_text, "Assessment_url": url}
+        for query_text in test_df['Query']
+        for url in predictions[query_text]
+    ]
 
     # Save final CSV in the required format
     output_df = pd.DataFrame(submission_rows)
-    output_path = "final_submission_predictions.csv"
     output_df.to_csv(output_path, index=False)
 
     print(f"\nFile created: {output_path}")
@@ -55,4 +178,16 @@ def generate_csv():
 
 
 if __name__ == "__main__":
-    generate_csv()
+    parser = argparse.ArgumentParser(description="Generate predictions for the test queries.")
+    parser.add_argument("--reranker", choices=RERANKERS, default=RERANKER,
+                        help="Reranking stage to use (default: RERANKER env or 'llm')")
+    parser.add_argument("--concurrency", type=int, default=RERANK_CONCURRENCY,
+                        help="Reranks in flight at once")
+    parser.add_argument("--rate-limit", type=float, default=RERANK_RATE_LIMIT,
+                        help="Reranks started per second (0 disables limiting)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Submission CSV to write")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="JSONL checkpoint of finished queries")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+    generate_csv(args.reranker, concurrency=args.concurrency, rate_limit=args.rate_limit,
+                 output_path=args.output, checkpoint_path=args.checkpoint, resume=not args.fresh)
@@ -0,0 +1,258 @@
+"""
+Evaluation runner for the SHL Assessment Recommendation System.
+
+Runs every labelled query of the training set through the recommendation
+pipeline, either in-process (Retriever + reranker, timed per stage) or over
+HTTP against a running API, with configurable concurrency. Reports Recall@K,
+MAP@K and MRR together with p50/p95/p99 latencies, and writes everything as
+JSON so results can be compared across commits.
+
+    python evaluations/run_evaluation.py --mode inprocess --concurrency 4
+    python evaluations/run_evaluation.py --mode http --api-url http://127.0.0.1:8001/recommend
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Fix path to allow importing from 'src' root
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(proj_root)
+
+from evaluations.calculate_metrics import API_URL, DATASET_PATH, build_slug_index, extract_assessment_name
+from src.engine.reranker import RERANKER, RERANKERS
+
+MODES = ("inprocess", "http")
+# Stages timed by the in-process runner; over HTTP only the total is observable
+STAGES = ("embed", "search", "diversify", "rerank", "format", "total")
+PERCENTILES = (50, 95, 99)
+TOP_K = 10
+N_CANDIDATES = 50
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "evaluation_results.json")
+
+
+def load_ground_truth(dataset_path=DATASET_PATH):
+    """
+    Load the labelled queries, grouping the (Query, Assessment_url) rows by query.
+
+    Returns:
+        dict: query -> set of normalized assessment slugs
+    """
+    return build_slug_index(pd.read_csv(dataset_path))
+
+
+def score_ranking(ranked_slugs, relevant, k=TOP_K):
+    """
+    Score one ranked list against its label set.
+
+    Returns:
+        dict: recall, average precision (AP@k) and reciprocal rank within the top k
+    """
+    hits = 0
+    precision_sum = 0.0
+    reciprocal_rank = 0.0
+    seen = set()
+    for rank, slug in enumerate(ranked_slugs[:k], start=1):
+        if slug in relevant and slug not in seen:
+            hits += 1
+            precision_sum += hits / rank
+            if not reciprocal_rank:
+                reciprocal_rank = 1.0 / rank
+        seen.add(slug)
+
+    return {
+        "recall": hits / len(relevant),
+        "average_precision": precision_sum / min(len(relevant), k),
+        "reciprocal_rank": reciprocal_rank,
+    }
+
+
+def latency_summary(samples):
+    """p50/p95/p99, mean and max of latency samples given in seconds, reported in ms."""
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000.0
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 2) for p in PERCENTILES}
+    summary.update({"mean": round(float(values.mean()), 2), "max": round(float(values.max()), 2),
+                    "count": len(samples)})
+    return summary
+
+
+class InProcessRunner:
+    """Runs queries through the Retriever and reranker in this process, timing each stage."""
+
+    def __init__(self, reranker_name=None, n_candidates=N_CANDIDATES):
+        from src.api.formatting import format_recommendations
+        from src.engine.retriever import Retriever
+        from src.engine.reranker import get_reranker
+
+        self.format_recommendations = format_recommendations
+        self.retriever = Retriever()
+        self.reranker = get_reranker(reranker_name)
+        self.n_candidates = n_candidates
+
+    def run(self, query):
+        """
+        Returns:
+            tuple: (recommendations, {stage: seconds}, ranking source)
+        """
+        timings = {}
+        start = time.perf_counter()
+
+        plans, chunk_embeddings = self.retriever.embed_queries([query])
+        timings["embed"] = time.perf_counter() - start
+
+        mark = time.perf_counter()
+        candidates = self.retriever.search_prepared(plans, chunk_embeddings, n_results=self.n_candidates)[0]
+        timings["search"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        candidates = self.retriever.diversify(candidates)
+        timings["diversify"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        final_results, source = self.reranker.rerank_with_source(plans[0].text, candidates)
+        timings["rerank"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        recommendations = self.format_recommendations(final_results)
+        timings["format"] = time.perf_counter() - mark
+
+        timings["total"] = time.perf_counter() - start
+        return recommendations, timings, source
+
+
+class HttpRunner:
+    """Posts queries to a running API; only the end-to-end latency is measured."""
+
+    def __init__(self, api_url=API_URL, timeout=50, concurrency=1):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def run(self, query):
+        start = time.perf_counter()
+        response = self.session.post(self.api_url, json={"query": query}, timeout=self.timeout)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+
+        data = response.json()
+        return data.get("recommended_assessments", []), {"total": elapsed}, data.get("ranking_source")
+
+
+def evaluate(runner, ground_truth, concurrency=1, k=TOP_K):
+    """
+    Run every query through a runner and aggregate quality and latency.
+
+    Args:
+        runner (InProcessRunner | HttpRunner): Pipeline to evaluate
+        ground_truth (dict): query -> set of relevant slugs
+        concurrency (int): Queries in flight at once
+        k (int): Cut-off for Recall@K and MAP@K
+
+    Returns:
+        dict: Aggregate metrics, latency percentiles per stage and per-query details
+    """
+    def run_one(query):
+        try:
+            recommendations, timings, source = runner.run(query)
+            return query, recommendations, timings, source, None
+        except Exception as e:
+            return query, [], {}, None, str(e)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        outcomes = list(pool.map(run_one, ground_truth))
+    wall_time = time.perf_counter() - started
+
+    per_query = []
+    stage_samples = {stage: [] for stage in STAGES}
+    for query, recommendations, timings, source, error in outcomes:
+        relevant = ground_truth[query]
+        ranked = [extract_assessment_name(rec.get("url", "")) for rec in recommendations]
+        scores = score_ranking(ranked, relevant, k=k)
+        for stage, seconds in timings.items():
+            stage_samples[stage].append(seconds)
+        per_query.append({
+            "query": query,
+            "relevant": sorted(relevant),
+            "recommended": ranked[:k],
+            "ranking_source": source,
+            "error": error,
+            **{name: round(value, 4) for name, value in scores.items()},
+            "latency_ms": {stage: round(seconds * 1000.0, 2) for stage, seconds in timings.items()},
+        })
+
+    # Failed queries count as misses, so errors cannot inflate the scores
+    n = max(len(per_query), 1)
+    return {
+        "metrics": {
+            f"recall@{k}": round(sum(row["recall"] for row in per_query) / n, 4),
+            f"map@{k}": round(sum(row["average_precision"] for row in per_query) / n, 4),
+            "mrr": round(sum(row["reciprocal_rank"] for row in per_query) / n, 4),
+            "queries": len(per_query),
+            "errors": sum(row["error"] is not None for row in per_query),
+        },
+        "latency_ms": {stage: latency_summary(samples) for stage, samples in stage_samples.items() if samples},
+        "throughput_qps": round(len(per_query) / wall_time, 3) if wall_time else None,
+        "per_query": per_query,
+    }
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=proj_root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate recommendation quality and latency.")
+    parser.add_argument("--mode", choices=MODES, default="inprocess",
+                        help="Run the pipeline in this process or call a running API")
+    parser.add_argument("--api-url", default=API_URL, help="Recommend endpoint for --mode http")
+    parser.add_argument("--reranker", choices=RERANKERS, default=RERANKER,
+                        help="Reranker for --mode inprocess (default: RERANKER env or 'llm')")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries in flight at once")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Cut-off for Recall@K and MAP@K")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="CSV of (Query, Assessment_url) rows")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="JSON file to write")
+    args = parser.parse_args()
+
+    ground_truth = load_ground_truth(args.dataset)
+    print(f"Evaluating {len(ground_truth)} unique queries ({args.mode}, concurrency={args.concurrency})...")
+
+    if args.mode == "http":
+        runner = HttpRunner(args.api_url, concurrency=args.concurrency)
+    else:
+        runner = InProcessRunner(args.reranker)
+
+    report = evaluate(runner, ground_truth, concurrency=args.concurrency, k=args.k)
+    report = {
+        "config": {"mode": args.mode, "concurrency": args.concurrency, "k": args.k,
+                   "reranker": args.reranker if args.mode == "inprocess" else None,
+                   "dataset": os.path.relpath(args.dataset, proj_root), "commit": git_commit(),
+                   "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+        **report,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, value in report["metrics"].items():
+        print(f" - {name}: {value}")
+    for stage, summary in report["latency_ms"].items():
+        print(f" - {stage:7s} p50={summary['p50']}ms p95={summary['p95']}ms p99={summary['p99']}ms")
+    print(f"Saved to {args.output}")
@@ -0,0 +1,41 @@
+def format_recommendations(final_results):
+    """
+    Format ranked assessment dictionaries into the API response shape.
+
+    Args:
+        final_results (list): Ranked list of assessment dictionaries
+
+    Returns:
+        list: Recommendations with all required fields
+    """
+    formatted_recommendations = []
+    for item in final_results:
+        raw_type = item.get('test_type', "[]")
+
+        # Process test_type to ensure consistent format
+        if isinstance(raw_type, str):
+            # Clean string by removing brackets and quotes
+            clean_str = raw_type.replace("[", "").replace("]", "").replace("'", "").replace('"', "")
+            # Split by comma and clean whitespace
+            t_type = clean_str.split(",")
+            t_type = [t.strip() for t in t_type if t.strip()]
+        else:
+            # Use raw_type directly if it's already a list
+            t_type = raw_type
+
+        # Ensure t_type is always a list
+        if not isinstance(t_type, list):
+            t_type = [str(t_type)]
+
+        # Format the recommendation with all required fields
+        formatted_recommendations.append({
+            "url": item.get("url", ""),
+            "name": item.get("name", "Unknown"),
+            "adaptive_support": item.get("adaptive_support", "No"),
+            "description": item.get("description", ""),
+            "duration": int(float(item.get("duration", 0))),
+            "remote_support": item.get("remote_support", "No"),
+            "test_type": t_type
+        })
+
+    return formatted_recommendations
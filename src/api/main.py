@@ -1,7 +1,11 @@
+import asyncio
 import os
 import sys
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 import uvicorn
 
 # Add project root to path for imports
@@ -9,83 +13,263 @@ proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if proj_root not in sys.path:
     sys.path.insert(0, proj_root)
 
-from src.engine.retriever import Retriever
-from src.engine.llm_handler import LLMHandler
+from src.engine.bundle import BUNDLE_DURATION_LIMIT, BUNDLE_ITEMS_LIMIT, BUNDLE_MAX_ITEMS, optimize_bundle
+from src.engine.reranker import SOURCE_DIVERSITY, get_reranker
+from src.engine.cache import cache_stats, invalidate_all
+from src.engine.query_understanding import QUERY_URL_TIMEOUT
+from src.api.formatting import format_recommendations
 
-app = FastAPI(title="SHL Assessment Recommendation System")
+# Candidates retrieved per query for reranking (hybrid retrieval needs fewer for the same recall)
+N_CANDIDATES = int(os.getenv("N_CANDIDATES", "50"))
+# End-to-end time budget per request; the LLM call is cancelled when it would overrun
+RECOMMEND_DEADLINE_SECONDS = float(os.getenv("RECOMMEND_DEADLINE_SECONDS", "10"))
+# Time kept back from the LLM for formatting and sending the response
+DEADLINE_MARGIN_SECONDS = float(os.getenv("DEADLINE_MARGIN_SECONDS", "0.25"))
+# Largest /recommend/batch request, and how many of its queries are reranked at once
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "32"))
+BATCH_RERANK_CONCURRENCY = int(os.getenv("BATCH_RERANK_CONCURRENCY", "8"))
 
-# Initialize engine components
-try:
+# Query embedded and searched once during warm-up, so lazy model kernels are built before traffic
+WARMUP_QUERY = "Java developer who collaborates with business teams"
+
+# Engine components, built in the background after the server binds
+retriever = None
+reranker = None
+# "starting" until warm-up finishes, then "ready" or "failed"
+engine_state = {"status": "starting", "detail": None, "warmup_seconds": None}
+
+
+def load_engine():
+    """
+    Build and warm up the engine components (blocking; runs off the event loop).
+
+    Importing the retriever pulls in chromadb and the embedding model, so it
+    is deferred to here instead of happening at module import.
+    """
+    global retriever, reranker
+    from src.engine.retriever import Retriever
+
+    start = time.monotonic()
     print("Initializing Search Engine...")
-    retriever = Retriever()
-    llm_handler = LLMHandler()
-    print("Search Engine Initialized Successfully!")
-except Exception as e:
-    print(f"Error initializing search engine: {e}")
-    retriever = None
-    llm_handler = None
+    new_retriever = Retriever()
+    # RERANKER selects the stage: "llm" (Gemini) or "cross-encoder" (local, CPU-only)
+    new_reranker = get_reranker()
+
+    # Embed a dummy query and search with it, bypassing the query cache
+    embeddings = new_retriever.embed_func([WARMUP_QUERY])
+    new_retriever.search_embedded([WARMUP_QUERY], embeddings, n_results=N_CANDIDATES)
+
+    retriever, reranker = new_retriever, new_reranker
+    engine_state.update(status="ready", warmup_seconds=round(time.monotonic() - start, 3))
+    print(f"Search Engine Initialized Successfully in {engine_state['warmup_seconds']}s!")
+
+
+async def warm_up_engine():
+    """Load the engine on a worker thread so the server answers /health meanwhile."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, load_engine)
+    except Exception as e:
+        print(f"Error initializing search engine: {e}")
+        engine_state.update(status="failed", detail=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start the engine warm-up without delaying the server from binding."""
+    warmup = asyncio.create_task(warm_up_engine())
+    yield
+    warmup.cancel()
+
+
+app = FastAPI(title="SHL Assessment Recommendation System", lifespan=lifespan)
 
 class QueryRequest(BaseModel):
-    """Request model for assessment recommendations."""
+    """
+    Request model for assessment recommendations.
+
+    mode "ranked" returns the top 10; mode "fast" returns the top 10 of the
+    diversity stage without calling the reranker; mode "bundle" returns the
+    most relevant set whose total duration fits max_duration minutes.
+    """
     query: str
+    mode: Literal["ranked", "fast", "bundle"] = "ranked"
+    max_duration: Optional[int] = Field(None, gt=0, le=BUNDLE_DURATION_LIMIT)
+    max_items: int = Field(BUNDLE_MAX_ITEMS, ge=1, le=BUNDLE_ITEMS_LIMIT)
+
+class BatchQueryRequest(BaseModel):
+    """Request model for recommendations over several queries at once ("ranked" or "fast" mode)."""
+    queries: List[str] = Field(..., max_length=BATCH_MAX_QUERIES)
+    mode: Literal["ranked", "fast"] = "ranked"
+
+def llm_time_left(deadline):
+    """Seconds the LLM may still use before the request deadline."""
+    return deadline - time.monotonic() - DEADLINE_MARGIN_SECONDS
+
+def url_time_left(deadline):
+    """Seconds fetching a URL query's posting may take: QUERY_URL_TIMEOUT, within the request deadline."""
+    return min(QUERY_URL_TIMEOUT, llm_time_left(deadline))
+
+def require_engine():
+    """Raise 503 until the engine has finished warming up."""
+    if engine_state["status"] != "ready":
+        detail = "Engine is warming up" if engine_state["status"] == "starting" else "Engine is unavailable"
+        raise HTTPException(status_code=503, detail=detail)
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint to verify system status."""
-    if retriever and llm_handler:
-        return {"status": "healthy"}
-    else:
-        return {"status": "unhealthy", "detail": "Engine failed to initialize"}
+    """Liveness check: the server is up, whether or not the engine has warmed up."""
+    return {"status": "healthy", "engine": engine_state["status"]}
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness check: 200 once the engine can serve recommendations, 503 before or on failure."""
+    if engine_state["status"] != "ready":
+        raise HTTPException(status_code=503, detail=engine_state)
+    return engine_state
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Report size and hit/miss counters of the query and rerank caches."""
+    return cache_stats()
+
+@app.post("/cache/invalidate")
+def invalidate_cache():
+    """
+    Clear this worker's query and rerank caches.
+
+    Each worker also clears its caches by itself when the index snapshot
+    changes (see cache.check_index_version), so a rebuild needs no call here.
+    """
+    invalidate_all()
+    return {"status": "invalidated"}
 
 @app.post("/recommend")
-def recommend_assessment(request: QueryRequest):
+async def recommend_assessment(request: QueryRequest):
     """
     Get assessment recommendations based on a query.
 
-    Returns a list of recommended assessments ranked by relevance.
+    Returns a list of recommended assessments ranked by relevance. Embedding runs
+    on a dedicated executor and the LLM call is awaited, so no server thread is
+    held while Gemini responds.
+
+    The request is bounded by RECOMMEND_DEADLINE_SECONDS: if the LLM cannot answer
+    in time, the vector ranking is returned. `ranking_source` tells which path
+    produced the results ("llm", "cache", "cross_encoder", "vector", "error",
+    "timeout" or "diversity").
+
+    Candidates go through the diversity stage (MMR with hard/soft skill quotas)
+    before reranking, so the reranker gets a short, already balanced list. In
+    "fast" mode that list is returned as is and no LLM call is made.
+
+    In "bundle" mode the reranked order (followed by the remaining candidates)
+    feeds a knapsack optimizer that picks the most relevant assessments whose
+    durations add up to at most max_duration, keeping hard and soft skills balanced.
+
+    `query_constraints` reports what query understanding read from the query:
+    the stated time limit (applied as a filter outside bundle mode only with
+    QUERY_APPLY_DURATION), hinted
+    test types and the number of chunks embedded.
     """
-    if not retriever or not llm_handler:
-        raise HTTPException(status_code=503, detail="Engine is unavailable")
+    require_engine()
+    if request.mode == "bundle" and request.max_duration is None:
+        raise HTTPException(status_code=422, detail="Bundle mode needs max_duration (minutes)")
 
+    deadline = time.monotonic() + RECOMMEND_DEADLINE_SECONDS
     user_query = request.query
     print(f"User Query: {user_query}")
 
-    # Get initial results from vector search
-    results = retriever.search(user_query, n_results=100)
-    # Rerank results using LLM
-    final_results = llm_handler.rerank(user_query, results)
-
-    formatted_recommendations = []
-    for item in final_results:
-        raw_type = item.get('test_type', "[]")
-
-        # Process test_type to ensure consistent format
-        if isinstance(raw_type, str):
-            # Clean string by removing brackets and quotes
-            clean_str = raw_type.replace("[", "").replace("]", "").replace("'", "").replace('"', "")
-            # Split by comma and clean whitespace
-            t_type = clean_str.split(",")
-            t_type = [t.strip() for t in t_type if t.strip()]
-        else:
-            # Use raw_type directly if it's already a list
-            t_type = raw_type
-
-        # Ensure t_type is always a list
-        if not isinstance(t_type, list):
-            t_type = [str(t_type)]
-
-        # Format the recommendation with all required fields
-        formatted_recommendations.append({
-            "url": item.get("url", ""),
-            "name": item.get("name", "Unknown"),
-            "adaptive_support": item.get("adaptive_support", "No"),
-            "description": item.get("description", ""),
-            "duration": int(float(item.get("duration", 0))),
-            "remote_support": item.get("remote_support", "No"),
-            "test_type": t_type
+    # Get initial results from vector search; in bundle mode nothing longer than the budget can fit
+    filters = {"max_duration": request.max_duration} if request.mode == "bundle" else {}
+    # The plan (cleaned text with URL postings resolved, and constraints) is built on the executor too
+    plans, batch_results = await retriever.asearch_with_plans([user_query], n_results=N_CANDIDATES,
+                                                              url_timeout=url_time_left(deadline), **filters)
+    plan, results = plans[0], batch_results[0]
+    # Keep a short, balanced and non-redundant candidate list
+    candidates = await retriever.adiversify(results)
+
+    if request.mode == "fast":
+        return {
+            "recommended_assessments": format_recommendations(candidates[:10]),
+            "ranking_source": SOURCE_DIVERSITY,
+            "query_constraints": plan.constraints()
+        }
+
+    # Rerank candidates within the remaining time budget
+    final_results, source = await reranker.arerank_with_source(plan.text, candidates,
+                                                                  timeout=llm_time_left(deadline))
+
+    if request.mode == "ranked":
+        return {
+            "recommended_assessments": format_recommendations(final_results),
+            "ranking_source": source,
+            "query_constraints": plan.constraints()
+        }
+
+    # Reranked picks first, then the rest of the candidates in retrieval order
+    picked = {res["id"] for res in final_results}
+    ranked = final_results + [res for res in results if res["id"] not in picked]
+    bundle, total_duration = optimize_bundle(ranked, request.max_duration, max_items=request.max_items)
+
+    return {
+        "recommended_assessments": format_recommendations(bundle),
+        "ranking_source": source,
+        "total_duration": total_duration,
+        "max_duration": request.max_duration,
+        "query_constraints": plan.constraints()
+    }
+
+@app.post("/recommend/batch")
+async def recommend_assessment_batch(request: BatchQueryRequest):
+    """
+    Get assessment recommendations for several queries at once.
+
+    All queries are embedded in one forward pass and looked up with a single
+    multi-query vector search. Each entry matches what /recommend returns for it:
+    reranks run BATCH_RERANK_CONCURRENCY at a time, and each query gets its own
+    RECOMMEND_DEADLINE_SECONDS budget from when its rerank starts, so queries
+    waiting their turn do not fall back to "timeout". Batches are capped at
+    BATCH_MAX_QUERIES queries (422 above).
+    """
+    require_engine()
+
+    deadline = time.monotonic() + RECOMMEND_DEADLINE_SECONDS
+
+    queries = request.queries
+    print(f"Batch of {len(queries)} queries")
+
+    # Get initial results for every query from one vector search
+    plans, batch_results = await retriever.asearch_with_plans(queries, n_results=N_CANDIDATES,
+                                                              url_timeout=url_time_left(deadline))
+
+    # Diversify every query's results, then rerank them concurrently
+    batch_candidates = await asyncio.gather(*[
+        retriever.adiversify(results) for results in batch_results
+    ])
+    if request.mode == "fast":
+        batch_final = [(candidates[:10], SOURCE_DIVERSITY) for candidates in batch_candidates]
+    else:
+        slots = asyncio.Semaphore(max(BATCH_RERANK_CONCURRENCY, 1))
+
+        async def rerank_one(plan, candidates):
+            async with slots:
+                query_deadline = time.monotonic() + RECOMMEND_DEADLINE_SECONDS
+                return await reranker.arerank_with_source(plan.text, candidates,
+                                                          timeout=llm_time_left(query_deadline))
+
+        batch_final = await asyncio.gather(*[
+            rerank_one(plan, candidates) for plan, candidates in zip(plans, batch_candidates)
+        ])
+
+    responses = []
+    for user_query, plan, (final_results, source) in zip(queries, plans, batch_final):
+        responses.append({
+            "query": user_query,
+            "recommended_assessments": format_recommendations(final_results),
+            "ranking_source": source,
+            "query_constraints": plan.constraints()
         })
 
-    return {"recommended_assessments": formatted_recommendations}
+    return {"results": responses}
 
 if __name__ == "__main__":
     print("Starting API Server on http://127.0.0.1:8001")
@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+import threading
+
+from http_cache import content_hash
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "raw", "html_archive")
+INDEX_NAME = "index.json"
+
+
+class PageArchive:
+    """
+    Compressed, content-addressed archive of crawled pages for offline replay.
+
+    Bodies are stored once per distinct content as blobs/<sha[:2]>/<sha>.html.gz;
+    index.json maps each URL to the hash and HTTP status of its last recorded
+    response. Identical pages (and re-recorded unchanged pages) share a blob.
+    """
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        """Open (or create) the archive stored in archive_dir."""
+        self.archive_dir = archive_dir
+        self.blobs_dir = os.path.join(archive_dir, "blobs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        index_path = os.path.join(archive_dir, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self.entries
+
+    def record(self, url, status, text):
+        """Store the response of a URL, replacing any earlier recording."""
+        digest = content_hash(text)
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{threading.get_ident()}"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self.entries[url] = {"sha256": digest, "status": status}
+            self._dirty = True
+
+    def lookup(self, url):
+        """
+        Return the recorded response of a URL.
+
+        Returns:
+            tuple: (status code, body), or None if the URL was never recorded
+        """
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry:
+            return None
+        path = self._blob_path(entry["sha256"])
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return entry["status"], f.read()
+
+    def bodies(self):
+        """Yield (url, body) for every recorded page with a 200 response."""
+        with self._lock:
+            entries = sorted(self.entries.items())
+        for url, entry in entries:
+            if entry["status"] == 200:
+                response = self.lookup(url)
+                if response is not None:
+                    yield url, response[1]
+
+    def save(self):
+        """Write the index to disk atomically if anything was recorded."""
+        with self._lock:
+            if not self._dirty:
+                return
+            index_path = os.path.join(self.archive_dir, INDEX_NAME)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, index_path)
+            self._dirty = False
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], f"{digest}.html.gz")
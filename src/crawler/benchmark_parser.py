@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of the detail page parsing engines.
+
+Parses every detail page fixture in detail_fixtures/ (plus any detail
+pages in the crawler's response cache and page archive) with each available
+engine and reports the time per page. Every engine must return the same
+fields as the reference html.parser path, and the reference must return the
+fields listed in detail_fixtures/expected.json; the script exits with status 1
+otherwise.
+
+The fixtures are the detail section of a product page; each is wrapped in
+the site's page chrome (head, header navigation, footer) saved from the live
+catalogue, so the engines that narrow to the product container see a
+full-size page. Listing pages are skipped: they hold no details.
+
+    python benchmark_parser.py --repeat 3
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from details_parser import AVAILABLE_ENGINES, parse_details
+from archive import ARCHIVE_DIR, PageArchive
+from http_cache import CACHE_DIR, INDEX_NAME, ResponseCache
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "detail_fixtures")
+CHROME_NAME = "page_chrome.html"
+EXPECTED_NAME = "expected.json"
+CHROME_SLOT = "<!-- DETAIL -->"
+REFERENCE_ENGINE = "html.parser"
+
+
+def is_detail_url(url):
+    """True for assessment detail pages (not catalogue listing pages)."""
+    return "/view/" in url
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """
+    Build the fixture pages.
+
+    Returns:
+        tuple: ([(name, html)] with each fixture wrapped in the page chrome,
+                {name: expected fields})
+    """
+    with open(os.path.join(fixtures_dir, CHROME_NAME), "r", encoding="utf-8") as f:
+        chrome = f.read()
+    with open(os.path.join(fixtures_dir, EXPECTED_NAME), "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.html"))):
+        name = os.path.basename(path)
+        if name == CHROME_NAME:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((name, chrome.replace(CHROME_SLOT, f.read())))
+    return pages, expected
+
+
+def load_pages(archive_dir=ARCHIVE_DIR, cache_dir=CACHE_DIR):
+    """
+    Return the pages to benchmark and the known fields of the fixtures.
+
+    Returns:
+        tuple: ([(name, html)], {name: expected fields})
+    """
+    pages, expected = load_fixtures()
+    if os.path.exists(os.path.join(cache_dir, INDEX_NAME)):
+        cache = ResponseCache(cache_dir)
+        for url in sorted(cache.entries):
+            body = cache.body(url) if is_detail_url(url) else None
+            if body:
+                pages.append((url, body))
+    if os.path.isdir(archive_dir):
+        pages += [(url, body) for url, body in PageArchive(archive_dir).bodies() if is_detail_url(url)]
+    return pages, expected
+
+
+def benchmark(pages, expected=None, repeat=3):
+    """
+    Time each engine over all pages and compare its output with the reference.
+
+    Args:
+        pages (list): (name, html) pairs
+        expected (dict): name -> fields the reference must return for that page
+        repeat (int): Runs per engine; the best is reported
+
+    Returns:
+        tuple: (engine -> {"ms_per_page", "pages_per_second", "mismatches"},
+                names of pages where the reference differs from expected)
+    """
+    reference = [parse_details(html, engine=REFERENCE_ENGINE) for _, html in pages]
+    wrong = [name for (name, _), got in zip(pages, reference)
+             if name in (expected or {}) and got != expected[name]]
+
+    report = {}
+    for engine in AVAILABLE_ENGINES:
+        best = float("inf")
+        outputs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs = [parse_details(html, engine=engine) for _, html in pages]
+            best = min(best, time.perf_counter() - start)
+
+        mismatches = [name for (name, _), got, want in zip(pages, outputs, reference) if got != want]
+        report[engine] = {
+            "ms_per_page": 1000 * best / max(len(pages), 1),
+            "pages_per_second": len(pages) / best if best else 0.0,
+            "mismatches": mismatches,
+        }
+    return report, wrong
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the detail page parsing engines.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the best is reported")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Page archive recorded with crawler.py --record")
+    args = parser.parse_args()
+
+    pages, expected = load_pages(args.archive_dir)
+    print(f"Benchmarking {len(AVAILABLE_ENGINES)} engines over {len(pages)} detail pages (best of {args.repeat})...")
+    report, wrong = benchmark(pages, expected, repeat=args.repeat)
+
+    baseline = report[REFERENCE_ENGINE]["ms_per_page"]
+    for engine, stats in report.items():
+        status = "OK" if not stats["mismatches"] else f"{len(stats['mismatches'])} MISMATCHES"
+        print(f" - {engine:12s} {stats['ms_per_page']:8.2f} ms/page  "
+              f"{stats['pages_per_second']:8.1f} pages/s  x{baseline / stats['ms_per_page']:.1f}  {status}")
+        for name in stats["mismatches"]:
+            print(f"     mismatch: {name}")
+    for name in wrong:
+        print(f" - {REFERENCE_ENGINE} does not match {EXPECTED_NAME}: {name}")
+
+    if wrong or any(stats["mismatches"] for stats in report.values()):
+        sys.exit(1)
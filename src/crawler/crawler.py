@@ -1,115 +1,693 @@
+import argparse
+import csv
+import glob
+import queue
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlparse
+from urllib3.util.retry import Retry
 import pandas as pd
+import json
+import threading
 import time
-import re
 import os
-from details_parser import get_details
+from details_parser import AVAILABLE_ENGINES, DEFAULT_ENGINE, HEADERS, empty_details, parse_details
+from http_cache import CACHE_DIR, ResponseCache, compute_delta, content_hash
+from archive import ARCHIVE_DIR, PageArchive
 
-HEADERS = {"User-Agent": "Mozilla/5.0"}
 BASE_URL = "https://www.shl.com/products/product-catalog/"
 OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "raw", "shl_assessments.csv")
+DEBUG_DIR = os.path.join(os.path.dirname(__file__), "html_debugging_files")
+# URL -> record hash of the previous crawl (kept in the cache dir), used to compute the delta
+CRAWL_STATE_NAME = "last_crawl.json"
 
+PAGE_SIZE = 12
+MAX_ITEMS = 500
+# Detail pages fetched in parallel, and the request rate allowed per host (requests/second)
+CONCURRENCY = 8
+RATE_LIMIT = 4.0
+RETRIES = 3
+# None crawls live; "record" also archives every page; "replay" crawls from the archive offline
+ARCHIVE_MODES = (None, "record", "replay")
+# Raw pages waiting for a parser in the pipeline crawler
+QUEUE_SIZE = 32
 
-def crawl_shl():
+# Column order of the output CSV
+FIELDNAMES = ["name", "url", "description", "duration", "test_type", "remote_support", "adaptive_support"]
 
-    all_assessments = []
-    PAGE_SIZE = 12
-    MAX_ITEMS = 500
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests evenly at a fixed rate."""
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate (float): Requests per second; 0 or less disables limiting
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may send its next request."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PageFetcher:
+    """
+    Fetches pages through one pooled HTTP session with retries and per-host rate limiting.
+
+    With a ResponseCache, requests are conditional (If-None-Match / If-Modified-Since)
+    and unchanged pages are served from disk. With a PageArchive, every page
+    fetched is also recorded for offline replay (see ReplayFetcher).
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, rate_limit=RATE_LIMIT, retries=RETRIES, cache=None, archive=None):
+        """
+        Args:
+            concurrency (int): Expected number of parallel requests (sizes the connection pool)
+            rate_limit (float): Requests per second allowed per host
+            retries (int): Retries with exponential backoff on connection errors and 429/5xx
+            cache (ResponseCache): Optional persistent response cache
+            archive (PageArchive): Optional archive recording every fetched page
+        """
+        self.rate_limit = rate_limit
+        self.cache = cache
+        self.archive = archive
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(concurrency, 1), max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, timeout=30, headers=None):
+        """Fetch a URL once the host's rate limit allows it."""
+        self._limiter(urlparse(url).netloc).wait()
+        return self.session.get(url, timeout=timeout, headers=headers)
+
+    def fetch(self, url):
+        """
+        Fetch a page, revalidating it against the cache when there is one.
+
+        Returns:
+            tuple: (status code, body, unchanged) where unchanged is True when
+                   the body is the same as in the previous crawl
+        """
+        status, text, unchanged = self._fetch(url)
+        if self.archive is not None:
+            self.archive.record(url, status, text)
+        return status, text, unchanged
+
+    def _fetch(self, url):
+        if self.cache is None:
+            response = self.get(url)
+            return response.status_code, response.text, False
+
+        response = self.get(url, headers=self.cache.conditional_headers(url))
+        if response.status_code == 304:
+            body = self.cache.body(url)
+            if body is not None:
+                return 200, body, True
+            # Cache entry lost its body; fetch unconditionally
+            response = self.get(url)
+
+        if response.status_code != 200:
+            return response.status_code, response.text, False
+
+        changed = self.cache.store(url, response.text,
+                                   etag=response.headers.get("ETag"),
+                                   last_modified=response.headers.get("Last-Modified"))
+        return 200, response.text, not changed
+
+    def _limiter(self, host):
+        with self._limiters_lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate_limit)
+            return self._limiters[host]
+
+
+class ReplayFetcher:
+    """
+    Serves pages from a PageArchive instead of the network.
+
+    Drop-in replacement for PageFetcher: URLs missing from the archive answer
+    404, and no response cache is used, so every page is parsed again. Replays
+    are deterministic, which makes them suitable for parser tests and benchmarks.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.cache = None
+
+    def fetch(self, url):
+        """Return (status code, body, unchanged) as recorded for url."""
+        response = self.archive.lookup(url)
+        if response is None:
+            return 404, "", False
+        status, text = response
+        return status, text, False
+
+
+def fetch_details(fetcher, link, engine=None):
+    """Fetch and parse one detail page, returning empty details on failure."""
+    try:
+        status, text, unchanged = fetcher.fetch(link)
+
+        # Unchanged pages reuse the result parsed during an earlier crawl
+        if unchanged:
+            parsed = fetcher.cache.parsed(link)
+            if parsed is not None:
+                return dict(parsed)
+
+        details = parse_details(text, engine=engine)
+        if fetcher.cache is not None and status == 200:
+            fetcher.cache.set_parsed(link, dict(details))
+        return details
+    except Exception as e:
+        print(f"Error fetching details from {link}: {e}")
+        return empty_details()
+
+
+def parse_listing(html, page_url):
+    """
+    Parse one catalogue listing page.
+
+    Args:
+        html (str): Listing page HTML
+        page_url (str): URL the page was fetched from (relative links resolve against it)
+
+    Returns:
+        tuple: (rows, problem) where rows is a list of (name, link, adaptive_status)
+               and problem is None or a message explaining why the crawl should end
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    target_text = soup.find(string=lambda t: t and "Individual Test Solutions" in t)
+    if not target_text:
+        return [], "No trigger text found. Ending crawl."
+
+    # Crawl up the DOM tree to find the specific table holding the data
+    table = target_text.find_parent("table")
+    if not table:
+        return [], "No table found. Saved page for inspection. Ending crawl."
+
+    rows = table.find_all("tr")[1:]  # Skip header which have the column names
+    if not rows:
+        return [], "No rows found (End of catalog?)."
+
+    listing = []
+    for row in rows:
+        cols = row.find_all("td")
+        if not cols: continue
+
+        link_tag = cols[0].find("a", href=True)
+        if not link_tag: continue
+
+        name = link_tag.get_text(strip=True)
+        link = urljoin(page_url, link_tag['href'])
+
+        # Capture ADAPTIVE STATUS
+        adaptive_status = "No"
+        if len(cols) > 2:
+            adaptive_col = cols[2]
+
+            # Found during inspection: the '-yes' class inside the span marks a green 'Adaptive' indicator.
+            if adaptive_col.find("span", class_="catalogue_circle -yes"):
+                adaptive_status = "Yes"
+
+            elif adaptive_col.find(class_=lambda c: c and "-yes" in str(c)):
+                adaptive_status = "Yes"
+
+        listing.append((name, link, adaptive_status))
+
+    return listing, None
+
+
+def iter_listings(fetcher, base_url=BASE_URL, parse=parse_listing):
+    """
+    Walk the catalogue listing pages in order.
+
+    Args:
+        fetcher (PageFetcher): Fetcher to download pages with
+        base_url (str): Catalogue URL
+        parse (callable): parse(html, url) -> (rows, problem), e.g. parse_listing
+
+    Yields:
+        list: The (name, link, adaptive_status) rows of each listing page
+    """
+    cache = fetcher.cache
     for start_index in range(0, MAX_ITEMS, PAGE_SIZE):
 
-        url = f"{BASE_URL}?start={start_index}&type=1&type=1"
+        url = listing_url(base_url, start_index)
         print(f"Processing batch start={start_index} (URL: {url})...", end=" ")
 
         try:
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            print(f"HTTP {response.status_code}", end=" ")
+            status, text, unchanged = fetcher.fetch(url)
+            print(f"HTTP {status}{' (unchanged)' if unchanged else ''}", end=" ")
 
             # save HTML for debugging when things go wrong
-            debug_path = os.path.join(os.path.dirname(__file__), "html_debugging_files", f"last_page_debug_{start_index}.html")
-            with open(debug_path, "w", encoding="utf-8") as f:
-                f.write(response.text or f"Status: {response.status_code}\nNo body.")
+            debug_path = os.path.join(DEBUG_DIR, f"last_page_debug_{start_index}.html")
+            if not unchanged:
+                with open(debug_path, "w", encoding="utf-8") as f:
+                    f.write(text or f"Status: {status}\nNo body.")
             # Validate successful HTTP response status before parsing
-            if response.status_code != 200:
+            if status != 200:
                 print(f"- Saved debug HTML to `{debug_path}`. Skipping batch.")
                 continue
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Unchanged listings reuse the rows parsed during an earlier crawl
+            cached_listing = cache.parsed(url) if unchanged else None
+            if cached_listing is not None:
+                listing, problem = [tuple(row) for row in cached_listing], None
+            else:
+                listing, problem = parse(text, url)
+                if cache is not None and not problem:
+                    cache.set_parsed(url, listing)
+            if problem:
+                print(problem)
+                print(f"Debug HTML: `{debug_path}`")
+                return
 
-            target_text = soup.find(string=lambda t: t and "Individual Test Solutions" in t)
-            if not target_text:
-                print("No trigger text found. Ending crawl.")
-                break
+        except Exception as e:
+            print(f"Error on start={start_index}: {e}")
+            continue
 
-            # Crawl up the DOM tree to find the specific table holding the data
-            table = None
-            table = target_text.find_parent("table")
+        print(f"Found {len(listing)} items.")
+        yield listing
 
+        if len(listing) < PAGE_SIZE:
+            print("Reached the last page.")
+            return
 
-            if not table:
-                print("No table found. Saved page for inspection. Ending crawl.")
-                print(f"Debug HTML: `{debug_path}`")
-                break
 
-            rows = table.find_all("tr")[1:]  # Skip header which have the column names
-            if not rows:
-                print("No rows found (End of catalog?).")
-                break
+def listing_url(base_url, start_index):
+    """URL of the listing page starting at item start_index."""
+    return f"{base_url}?start={start_index}&type=1&type=1"
 
-            count_on_page = 0
-            for row in rows:
-                cols = row.find_all("td")
-                if not cols: continue
 
-                link_tag = cols[0].find("a", href=True)
-                if not link_tag: continue
+def make_fetcher(concurrency=CONCURRENCY, rate_limit=RATE_LIMIT, use_cache=True, cache_dir=CACHE_DIR,
+                 archive_mode=None, archive_dir=ARCHIVE_DIR):
+    """
+    Build the fetcher for a crawl.
 
-                name = link_tag.get_text(strip=True)
-                raw_link = link_tag['href']
-                link = raw_link if raw_link.startswith("http") else "https://www.shl.com" + raw_link
+    Args:
+        archive_mode (str): None for a live crawl, "record" to also archive every
+                            fetched page, "replay" to serve pages from the archive only
 
-                # Capture ADAPTIVE STATUS
-                adaptive_status = "No"
-                if len(cols) > 2:
-                    adaptive_col = cols[2]
+    Returns:
+        PageFetcher | ReplayFetcher
+    """
+    if archive_mode not in ARCHIVE_MODES:
+        raise ValueError(f"Unknown archive mode '{archive_mode}'. Choose from {ARCHIVE_MODES}.")
+    if archive_mode == "replay":
+        archive = PageArchive(archive_dir)
+        print(f"Replaying {len(archive)} archived pages from {archive_dir}")
+        return ReplayFetcher(archive)
 
-                    # Found during inspection: the '-yes' class inside the span marks a green 'Adaptive' indicator.
-                    if adaptive_col.find("span", class_="catalogue_circle -yes"):
-                        adaptive_status = "Yes"
-                    
-                    elif adaptive_col.find(class_=lambda c: c and "-yes" in str(c)):
-                        adaptive_status = "Yes"
+    cache = ResponseCache(cache_dir) if use_cache else None
+    archive = PageArchive(archive_dir) if archive_mode == "record" else None
+    return PageFetcher(concurrency=concurrency, rate_limit=rate_limit, cache=cache, archive=archive)
 
-                details = get_details(link)
-                details["adaptive_support"] = adaptive_status
 
-                all_assessments.append({
-                    "name": name,
-                    "url": link,
-                    **details
-                })
-                count_on_page += 1
+def import_saved_pages(archive, base_url=BASE_URL, cache_dir=CACHE_DIR):
+    """
+    Seed an archive with pages saved by earlier crawls.
 
-            print(f"Added {count_on_page} items.")
+    Listing pages come from html_debugging_files/last_page_debug_{start}.html
+    (recorded under the listing URL for base_url), detail pages from the
+    response cache in cache_dir, if there is one.
 
-            if count_on_page < PAGE_SIZE:
-                print("Reached the last page.")
-                break
+    Returns:
+        int: Number of pages imported
+    """
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(DEBUG_DIR, "last_page_debug_*.html"))):
+        start = os.path.basename(path)[len("last_page_debug_"):-len(".html")]
+        if not start.isdigit():
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        # Failed fetches are saved as a status stub; those pages were never served
+        if text.startswith("Status: "):
+            continue
+        archive.record(listing_url(base_url, int(start)), 200, text)
+        imported += 1
 
-            time.sleep(1)
+    if os.path.exists(os.path.join(cache_dir, "index.json")):
+        cache = ResponseCache(cache_dir)
+        for url in list(cache.entries):
+            body = cache.body(url)
+            if body is not None:
+                archive.record(url, 200, body)
+                imported += 1
 
-        except Exception as e:
-            print(f"Error on start={start_index}: {e}")
-            continue
+    archive.save()
+    return imported
 
-    df = pd.DataFrame(all_assessments)
+
+def crawl_shl(concurrency=CONCURRENCY, rate_limit=RATE_LIMIT, base_url=BASE_URL, output_path=OUTPUT_PATH,
+              use_cache=True, full_output=False, cache_dir=CACHE_DIR, engine=DEFAULT_ENGINE,
+              archive_mode=None, archive_dir=ARCHIVE_DIR):
+    """
+    Crawl the SHL product catalogue into a CSV.
+
+    Listing pages are walked in order; the detail pages of each listing are
+    fetched concurrently through one pooled session. Output order and schema
+    are the same as a serial crawl.
+
+    With the response cache, recrawls send conditional requests and skip
+    re-parsing unchanged pages. Every crawl writes a delta of added, changed
+    and removed URLs next to the CSV (<output>_delta.json); the CSV itself is
+    only rewritten when something changed.
+
+    Args:
+        concurrency (int): Detail pages fetched in parallel (1 crawls serially)
+        rate_limit (float): Requests per second allowed per host
+        base_url (str): Catalogue URL (point it at a local stand-in for testing)
+        output_path (str): CSV file to write
+        use_cache (bool): Use the persistent response cache for conditional requests
+        full_output (bool): Write the CSV even when the catalogue is unchanged
+        cache_dir (str): Directory of the response cache and the previous crawl's state
+        engine (str): Detail page parsing engine (see details_parser.AVAILABLE_ENGINES)
+        archive_mode (str): None, "record" (archive every page fetched) or "replay"
+                            (crawl entirely from the archive, without network access)
+        archive_dir (str): Directory of the page archive
+    """
+    check_replay_output(archive_mode, output_path)
+    fetcher = make_fetcher(concurrency, rate_limit, use_cache, cache_dir, archive_mode, archive_dir)
+    all_assessments = []
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for listing in iter_listings(fetcher, base_url):
+            # Fetch every detail page of this listing in parallel; map keeps listing order
+            links = [link for _, link, _ in listing]
+            all_details = pool.map(lambda link: fetch_details(fetcher, link, engine), links)
+            for (name, link, adaptive_status), details in zip(listing, all_details):
+                all_assessments.append(make_record(name, link, adaptive_status, details))
+
+    df = pd.DataFrame(all_assessments, columns=FIELDNAMES)
     print(f"Crawling Complete. Total Assessments: {len(df)}")
     if len(df) < 377:
         print(f"WARNING: Found {len(df)} items (Target: 377+).")
-    df.to_csv(OUTPUT_PATH, index=False)
-    print(f"Saved to {OUTPUT_PATH}")
+
+    record_hashes = {record["url"]: record_hash(record) for record in all_assessments}
+    has_changes = publish_delta(record_hashes, output_path, fetcher, cache_dir,
+                                save_state=archive_mode != "replay")
+
+    if has_changes or full_output or not os.path.exists(output_path):
+        df.to_csv(output_path, index=False)
+        print(f"Saved to {output_path}")
+    else:
+        print(f"Catalogue unchanged; kept {output_path}")
+
+
+def crawl_shl_pipeline(concurrency=CONCURRENCY, rate_limit=RATE_LIMIT, base_url=BASE_URL,
+                       output_path=OUTPUT_PATH, use_cache=True, full_output=False, cache_dir=CACHE_DIR,
+                       engine=DEFAULT_ENGINE, parse_workers=None, queue_size=QUEUE_SIZE,
+                       archive_mode=None, archive_dir=ARCHIVE_DIR):
+    """
+    Crawl the catalogue as a streaming fetch -> parse -> write pipeline.
+
+    Fetcher threads push raw detail HTML onto a bounded queue; a process pool
+    parses it outside the GIL (listing pages too); a writer streams records to
+    the CSV in crawl order as they complete. At most queue_size * 2 records
+    are in flight at once, from fetch until the ordered writer writes them
+    (records waiting on an earlier, slower one count too), so memory stays flat however large the catalogue
+    is, and parsing throughput scales with cores. Output is the same as crawl_shl().
+
+    Args:
+        concurrency (int): Detail pages fetched in parallel
+        rate_limit (float): Requests per second allowed per host
+        base_url (str): Catalogue URL (point it at a local stand-in for testing)
+        output_path (str): CSV file to write
+        use_cache (bool): Use the persistent response cache for conditional requests
+        full_output (bool): Write the CSV even when the catalogue is unchanged
+        cache_dir (str): Directory of the response cache and the previous crawl's state
+        engine (str): Detail page parsing engine (see details_parser.AVAILABLE_ENGINES)
+        parse_workers (int): Parser processes (defaults to the number of CPUs)
+        queue_size (int): Capacity of the raw page queue
+        archive_mode (str): None, "record" or "replay" (see crawl_shl())
+        archive_dir (str): Directory of the page archive
+    """
+    check_replay_output(archive_mode, output_path)
+    fetcher = make_fetcher(concurrency, rate_limit, use_cache, cache_dir, archive_mode, archive_dir)
+    cache = fetcher.cache
+
+    raw_pages = queue.Queue(maxsize=queue_size)
+    in_flight = threading.BoundedSemaphore(queue_size * 2)
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    # A slot is freed only once its record is written, which bounds the writer's reorder buffer as well
+    writer = RecordWriter(tmp_path, on_written=in_flight.release)
+
+    def fetch_raw(seq, name, link, adaptive_status):
+        """Fetcher stage: download one detail page and queue it for parsing."""
+        try:
+            status, text, unchanged = fetcher.fetch(link)
+        except Exception as e:
+            print(f"Error fetching details from {link}: {e}")
+            status, text, unchanged = None, "", False
+        parsed = cache.parsed(link) if unchanged else None
+        raw_pages.put((seq, name, link, adaptive_status, status, text, parsed))
+
+    def emit(seq, name, link, adaptive_status, details):
+        """Writer stage: hand a finished record to the ordered writer."""
+        writer.add(seq, make_record(name, link, adaptive_status, details))
+
+    def dispatch(parsers):
+        """Parser stage: send queued pages to the process pool (or straight on if cached)."""
+        while True:
+            item = raw_pages.get()
+            if item is None:
+                return
+            seq, name, link, adaptive_status, status, text, parsed = item
+            if parsed is not None:
+                emit(seq, name, link, adaptive_status, dict(parsed))
+                continue
+
+            def on_parsed(future, seq=seq, name=name, link=link, adaptive_status=adaptive_status, status=status):
+                try:
+                    details = future.result()
+                except Exception as e:
+                    print(f"Error parsing details from {link}: {e}")
+                    details = empty_details()
+                if cache is not None and status == 200:
+                    cache.set_parsed(link, dict(details))
+                emit(seq, name, link, adaptive_status, details)
+
+            parsers.submit(parse_details, text, engine).add_done_callback(on_parsed)
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parsers:
+        dispatcher = threading.Thread(target=dispatch, args=(parsers,), daemon=True)
+        dispatcher.start()
+
+        def parse_in_pool(html, url):
+            return parsers.submit(parse_listing, html, url).result()
+
+        seq = 0
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as fetchers:
+            for listing in iter_listings(fetcher, base_url, parse=parse_in_pool):
+                for name, link, adaptive_status in listing:
+                    in_flight.acquire()
+                    fetchers.submit(fetch_raw, seq, name, link, adaptive_status)
+                    seq += 1
+
+        raw_pages.put(None)
+        dispatcher.join()
+    # Leaving the pool waits for the last parses, whose callbacks write the final records
+    writer.close()
+
+    print(f"Crawling Complete. Total Assessments: {writer.count}")
+    if writer.count < 377:
+        print(f"WARNING: Found {writer.count} items (Target: 377+).")
+
+    has_changes = publish_delta(writer.record_hashes, output_path, fetcher, cache_dir,
+                                save_state=archive_mode != "replay")
+    if has_changes or full_output or not os.path.exists(output_path):
+        os.replace(tmp_path, output_path)
+        print(f"Saved to {output_path}")
+    else:
+        os.remove(tmp_path)
+        print(f"Catalogue unchanged; kept {output_path}")
+
+
+class RecordWriter:
+    """
+    Streams records to a CSV in crawl order as they complete.
+
+    Records that finish early are held until all earlier ones are written,
+    so only the out-of-order window is kept in memory.
+    """
+
+    def __init__(self, path, on_written=None):
+        """
+        Args:
+            path (str): CSV file to write
+            on_written (callable): Called once for every record written to the file
+        """
+        self._on_written = on_written
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDNAMES, lineterminator=os.linesep)
+        self._writer.writeheader()
+        self._pending = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self.record_hashes = {}
+        self.count = 0
+
+    def add(self, seq, record):
+        """Accept the record with sequence number seq and flush every record now in order."""
+        with self._lock:
+            self._pending[seq] = record
+            while self._next_seq in self._pending:
+                ready = self._pending.pop(self._next_seq)
+                self._writer.writerow(ready)
+                self.record_hashes[ready["url"]] = record_hash(ready)
+                self.count += 1
+                self._next_seq += 1
+                if self._on_written is not None:
+                    self._on_written()
+
+    def close(self):
+        self._file.close()
+
+
+def make_record(name, link, adaptive_status, details):
+    """Build one output row from a listing entry and its parsed details."""
+    details["adaptive_support"] = adaptive_status
+    return {
+        "name": name,
+        "url": link,
+        **details
+    }
+
+
+def record_hash(record):
+    """Hash of an output row, used to detect changed assessments between crawls."""
+    return content_hash(json.dumps(record, sort_keys=True, default=str))
+
+
+def publish_delta(record_hashes, output_path, fetcher, cache_dir, save_state=True):
+    """
+    Compare against the previous crawl and publish the delta for incremental indexing.
+
+    Also persists the fetcher's response cache and page archive. Replays pass
+    save_state=False so an old recording never becomes the live crawl's baseline.
+
+    Returns:
+        bool: True if any assessment was added, changed or removed
+    """
+    state_path = os.path.join(cache_dir, CRAWL_STATE_NAME)
+    delta_path = delta_path_for(output_path)
+    delta = compute_delta(load_json(state_path, default={}), record_hashes)
+    write_json(delta_path, {**delta, "total": len(record_hashes),
+                            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
+    print(f"Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+          f"{len(delta['removed'])} removed. Saved to {delta_path}")
+
+    if fetcher.cache is not None:
+        fetcher.cache.save()
+    if fetcher.archive is not None:
+        fetcher.archive.save()
+    if record_hashes and save_state:
+        write_json(state_path, record_hashes)
+
+    return any(delta[key] for key in ("added", "changed", "removed"))
+
+
+def check_replay_output(archive_mode, output_path):
+    """
+    Refuse to replay into the live catalogue.
+
+    A replay writes its CSV and delta like a crawl, so replaying an old
+    archive into OUTPUT_PATH would overwrite the production catalogue and its
+    change log.
+    """
+    if archive_mode == "replay" and os.path.abspath(output_path) == os.path.abspath(OUTPUT_PATH):
+        raise ValueError(f"A replay must not write the live catalogue {OUTPUT_PATH}; pass another output path")
+
+
+def delta_path_for(output_path):
+    """Path of the delta file written next to a crawl's CSV."""
+    return os.path.splitext(output_path)[0] + "_delta.json"
+
+
+def load_json(path, default=None):
+    """Read a JSON file, or return default if it does not exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    """Write JSON atomically, creating the parent directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 
 if __name__ == "__main__":
-    crawl_shl()
+    parser = argparse.ArgumentParser(description="Crawl the SHL product catalogue.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="Detail pages fetched in parallel (1 crawls serially)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="Requests per second allowed per host (0 disables limiting)")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="Catalogue URL, e.g. a local stand-in from local_server.py")
+    parser.add_argument("--output", default=None,
+                        help=f"CSV file to write (default {OUTPUT_PATH}; required with --replay)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Download every page instead of sending conditional requests")
+    parser.add_argument("--full-output", action="store_true",
+                        help="Write the CSV even when the catalogue is unchanged")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Directory of the response cache")
+    parser.add_argument("--engine", choices=AVAILABLE_ENGINES, default=DEFAULT_ENGINE,
+                        help="Detail page parsing engine (fastest installed by default)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Stream pages through a process pool of parsers and write rows incrementally")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Parser processes for --pipeline (defaults to the number of CPUs)")
+    parser.add_argument("--record", action="store_true",
+                        help="Record every fetched page in the compressed page archive")
+    parser.add_argument("--replay", action="store_true",
+                        help="Crawl entirely from the page archive, without network access")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directory of the page archive")
+    parser.add_argument("--import-saved", action="store_true",
+                        help="Import html_debugging_files/ and the response cache into the archive, then exit")
+    args = parser.parse_args()
 
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if args.replay and (args.output is None or os.path.abspath(args.output) == os.path.abspath(OUTPUT_PATH)):
+        parser.error("--replay needs an explicit --output other than the live catalogue")
+    if args.import_saved:
+        count = import_saved_pages(PageArchive(args.archive_dir), base_url=args.base_url, cache_dir=args.cache_dir)
+        print(f"Imported {count} pages into {args.archive_dir}")
+        raise SystemExit(0)
 
+    options = dict(concurrency=args.concurrency, rate_limit=args.rate_limit,
+                   base_url=args.base_url, output_path=args.output or OUTPUT_PATH,
+                   use_cache=not args.no_cache, full_output=args.full_output, cache_dir=args.cache_dir,
+                   engine=args.engine, archive_dir=args.archive_dir,
+                   archive_mode="record" if args.record else "replay" if args.replay else None)
+    if args.pipeline:
+        crawl_shl_pipeline(parse_workers=args.parse_workers, **options)
+    else:
+        crawl_shl(**options)
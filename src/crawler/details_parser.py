@@ -2,6 +2,17 @@ import requests
 from bs4 import BeautifulSoup
 import re
 
+# Optional faster parser; the stdlib html.parser path is always available
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+        HAS_SELECTOLAX = True
+    except ImportError:
+        HAS_SELECTOLAX = False
+
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 TYPE_MAP = {
     'A': 'Ability & Aptitude',
@@ -14,57 +25,190 @@ TYPE_MAP = {
     'S': 'Simulations'
 }
 
-def get_details(url):
+# Parsing engines, fastest first. "html.parser" is the original full-page path and
+# serves as the reference; selectolax narrows to the product container first.
+ENGINES = ("selectolax", "html.parser")
+AVAILABLE_ENGINES = tuple(
+    engine for engine, available in zip(ENGINES, (HAS_SELECTOLAX, True)) if available
+)
+DEFAULT_ENGINE = AVAILABLE_ENGINES[0]
+
+# Elements that hold the product details, tried in order before falling back to the whole page
+CONTAINER_SELECTORS = (".product-catalogue", "main", "body")
+
+DURATION_PATTERN = re.compile(r"Approximate Completion Time in minutes\s*=\s*(\d+)", re.IGNORECASE)
+TEST_TYPE_PATTERN = re.compile(r"Test\s*Type\s*:", re.I)
+REMOTE_PATTERN = re.compile(r"Remote\s*Testing", re.I)
+TYPE_CODE_PATTERN = re.compile(r"\b([A-Z])\b")
+YES_CLASS_PATTERN = re.compile(r"yes", re.I)
+YES_WORD_PATTERN = re.compile(r"\byes\b", re.I)
+DESCRIPTION_HEADERS = ("h2", "h3", "h4")
+# Labels the parsers search for; a container is only used if the page has none outside it
+LABEL_PATTERNS = (DURATION_PATTERN, TEST_TYPE_PATTERN, REMOTE_PATTERN)
+
+def get_details(url, session=None):
+    """
+    Fetch an assessment detail page and parse it.
+
+    Args:
+        url (str): Detail page URL
+        session (requests.Session): Pooled session to reuse; a one-off request is made without it
+
+    Returns:
+        dict: description, duration, test_type and remote_support
+    """
+    try:
+        response = (session or requests).get(url, headers=HEADERS, timeout=30)
+        return parse_details(response.text)
+    except Exception as e:
+        print(f"Error fetching details from {url}: {e}")
+        return empty_details()
 
-    data = {
+
+def empty_details():
+    """Details returned when a page cannot be fetched or parsed."""
+    return {
         "description": "",
         "duration": 0,
         "test_type": [],
         "remote_support": "No"
     }
 
+
+def parse_details(html, engine=None):
+    """
+    Parse the fields of an assessment detail page.
+
+    Args:
+        html (str): Page HTML
+        engine (str): One of AVAILABLE_ENGINES; defaults to the fastest installed
+
+    Returns:
+        dict: description, duration, test_type and remote_support
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine not in AVAILABLE_ENGINES:
+        raise ValueError(f"Parsing engine '{engine}' is not available. Installed: {AVAILABLE_ENGINES}")
+
     try:
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        desc_header = soup.find(
-            lambda tag: tag.name in ["h2", "h3", "h4"]
-            and tag.get_text(strip=True) == "Description"
-        )
-        if desc_header:
-            desc_content = desc_header.find_next_sibling("p")
-            if desc_content:
-                data["description"] = desc_content.get_text(strip=True)
-
-
-        page_text = soup.get_text()
-        dur_match = re.search(r"Approximate Completion Time in minutes\s*=\s*(\d+)", page_text, re.IGNORECASE)
-        if dur_match:
-            data["duration"] = int(dur_match.group(1))
-
-        type_label = soup.find(string=re.compile(r"Test\s*Type\s*:", re.I))
-        if type_label:
-            container = type_label.parent
-            found_text = container.get_text(separator=" ", strip=True)
-            matches = re.findall(r"\b([A-Z])\b", found_text)
-            for m in matches:
-                if m in TYPE_MAP:
-                    data["test_type"].append(TYPE_MAP[m])
-
-        remote_label = soup.find(string=re.compile(r"Remote\s*Testing", re.I))
-
-        if remote_label:
-            container = remote_label.parent
-            # look for a span whose class contains "yes" or the word "yes" in nearby text
-            if (container.find("span", class_=re.compile(r"yes", re.I))
-                or re.search(r"\byes\b", container.get_text(), re.I)):
-                data["remote_support"] = "Yes"
+        if engine == "selectolax":
+            return _parse_selectolax(html or "")
+        return _parse_soup(BeautifulSoup(html or "", 'html.parser'))
 
     except Exception as e:
-        print(f"Error fetching details from {url}: {e}")
+        print(f"Error parsing details: {e}")
+        return empty_details()
+
+
+def _lexbor_labels(node):
+    """
+    Number of occurrences of each label (and of "Description" headers) under a selectolax node.
+
+    The reference parser searches the whole page and takes the first match of
+    each label, so the container is only used when every label on the page
+    lies inside it; otherwise both paths could pick different elements.
+    """
+    headers = sum(1 for tag in node.css(", ".join(DESCRIPTION_HEADERS)) if tag.text(strip=True) == "Description")
+    text = node.text()
+    return tuple(len(pattern.findall(text)) for pattern in LABEL_PATTERNS) + (headers,)
+
+
+def _parse_soup(soup):
+    """Extract the detail fields from a BeautifulSoup tree (or subtree)."""
+    data = empty_details()
+
+    desc_header = soup.find(
+        lambda tag: tag.name in DESCRIPTION_HEADERS
+        and tag.get_text(strip=True) == "Description"
+    )
+    if desc_header:
+        desc_content = desc_header.find_next_sibling("p")
+        if desc_content:
+            data["description"] = desc_content.get_text(strip=True)
+
+    page_text = soup.get_text()
+    dur_match = DURATION_PATTERN.search(page_text)
+    if dur_match:
+        data["duration"] = int(dur_match.group(1))
+
+    type_label = soup.find(string=TEST_TYPE_PATTERN)
+    if type_label:
+        container = type_label.parent
+        found_text = container.get_text(separator=" ", strip=True)
+        for m in TYPE_CODE_PATTERN.findall(found_text):
+            if m in TYPE_MAP:
+                data["test_type"].append(TYPE_MAP[m])
+
+    remote_label = soup.find(string=REMOTE_PATTERN)
+
+    if remote_label:
+        container = remote_label.parent
+        # look for a span whose class contains "yes" or the word "yes" in nearby text
+        if (container.find("span", class_=YES_CLASS_PATTERN)
+            or YES_WORD_PATTERN.search(container.get_text())):
+            data["remote_support"] = "Yes"
 
     return data
 
 
+def _parse_selectolax(html):
+    """Extract the detail fields with selectolax, mirroring _parse_soup."""
+    data = empty_details()
+    tree = HTMLParser(html)
+
+    root = None
+    for selector in CONTAINER_SELECTORS:
+        root = tree.css_first(selector)
+        if root is not None:
+            break
+    # Only narrow when no label lies outside the container
+    if root is None or (tree.root is not None and _lexbor_labels(root) != _lexbor_labels(tree.root)):
+        root = tree.root
+    if root is None:
+        return data
+
+    for header in root.css(", ".join(DESCRIPTION_HEADERS)):
+        if header.text(strip=True) == "Description":
+            sibling = header.next
+            while sibling is not None and sibling.tag != "p":
+                sibling = sibling.next
+            if sibling is not None:
+                data["description"] = sibling.text(strip=True)
+            break
+
+    dur_match = DURATION_PATTERN.search(root.text())
+    if dur_match:
+        data["duration"] = int(dur_match.group(1))
+
+    # Elements whose own text holds a label, like soup.find(string=...).parent
+    type_container = remote_container = None
+    for node in root.traverse():
+        if node.tag == "-text":
+            continue
+        own_text = node.text(deep=False)
+        if type_container is None and TEST_TYPE_PATTERN.search(own_text):
+            type_container = node
+        if remote_container is None and REMOTE_PATTERN.search(own_text):
+            remote_container = node
+        if type_container is not None and remote_container is not None:
+            break
+
+    if type_container is not None:
+        found_text = type_container.text(separator=" ", strip=True)
+        for m in TYPE_CODE_PATTERN.findall(found_text):
+            if m in TYPE_MAP:
+                data["test_type"].append(TYPE_MAP[m])
+
+    if remote_container is not None:
+        has_yes_span = any(
+            YES_CLASS_PATTERN.search(span.attributes.get("class") or "")
+            for span in remote_container.css("span")
+        )
+        if has_yes_span or YES_WORD_PATTERN.search(remote_container.text()):
+            data["remote_support"] = "Yes"
+
+    return data
+
 
 if __name__ == "__main__":
     get_details("https://www.shl.com/products/product-catalog/view/Apprentice + 8.0 Job Focused Assessment/")
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "raw", "http_cache")
+INDEX_NAME = "index.json"
+
+
+def content_hash(text):
+    """SHA-256 of a page body or record."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of fetched pages keyed by URL.
+
+    Each entry keeps the validators (ETag / Last-Modified) needed for
+    conditional requests, a hash of the body, the body itself and optionally
+    the parsed result, so unchanged pages need neither a download nor a re-parse.
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        """Open (or create) the cache stored in cache_dir."""
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+        index_path = os.path.join(cache_dir, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def conditional_headers(self, url):
+        """Headers that let the server answer 304 Not Modified for a cached URL."""
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, url):
+        """Return the cached body of a URL, or None."""
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry:
+            return None
+        path = os.path.join(self.bodies_dir, entry["body_file"])
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def store(self, url, text, etag=None, last_modified=None):
+        """
+        Record a freshly downloaded page.
+
+        Returns:
+            bool: True if the body differs from the cached one (or is new)
+        """
+        digest = content_hash(text)
+        body_file = hashlib.sha256(url.encode("utf-8")).hexdigest() + ".html"
+
+        with self._lock:
+            entry = self.entries.get(url, {})
+            changed = entry.get("sha256") != digest
+            entry.update({"etag": etag, "last_modified": last_modified,
+                          "sha256": digest, "body_file": body_file})
+            if changed:
+                entry.pop("parsed", None)
+            self.entries[url] = entry
+
+        if changed:
+            with open(os.path.join(self.bodies_dir, body_file), "w", encoding="utf-8") as f:
+                f.write(text)
+        return changed
+
+    def parsed(self, url):
+        """Return the parsed result cached for a URL, or None."""
+        with self._lock:
+            return self.entries.get(url, {}).get("parsed")
+
+    def set_parsed(self, url, parsed):
+        """Cache the parsed result of a URL's current body."""
+        with self._lock:
+            if url in self.entries:
+                self.entries[url]["parsed"] = parsed
+
+    def save(self):
+        """Write the index to disk atomically."""
+        index_path = os.path.join(self.cache_dir, INDEX_NAME)
+        tmp_path = f"{index_path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+        os.replace(tmp_path, index_path)
+
+
+def compute_delta(previous, current):
+    """
+    Compare two crawls given as {url: record hash}.
+
+    Returns:
+        dict: Sorted lists of added, changed and removed URLs
+    """
+    return {
+        "added": sorted(url for url in current if url not in previous),
+        "changed": sorted(url for url in current if url in previous and previous[url] != current[url]),
+        "removed": sorted(url for url in previous if url not in current),
+    }
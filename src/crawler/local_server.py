@@ -0,0 +1,98 @@
+"""
+Local HTTP stand-in for the SHL catalogue, for testing the crawler offline.
+
+Listing requests (`?start=N`) are answered with the saved page
+`html_debugging_files/last_page_debug_N.html`. Detail pages are not saved, so
+`/products/product-catalog/view/<slug>/` returns a small synthetic page in the
+same layout the detail parser expects. Responses carry an ETag and honour
+If-None-Match, so conditional recrawls can be exercised too. An optional
+delay simulates network latency.
+
+    python local_server.py --port 8765 --delay 0.2
+    python crawler.py --base-url http://127.0.0.1:8765/products/product-catalog/ --output /tmp/crawl.csv
+"""
+import argparse
+import hashlib
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+DEBUG_DIR = os.path.join(os.path.dirname(__file__), "html_debugging_files")
+
+DETAIL_TEMPLATE = """<html><body><main>
+<h1>{name}</h1>
+<div class="product-catalogue-training-calendar__row">
+<h4>Description</h4>
+<p>{name} measures skills relevant to the role.</p>
+</div>
+<div class="product-catalogue-training-calendar__row">
+<h4>Assessment length</h4>
+<p>Approximate Completion Time in minutes = {duration}</p>
+</div>
+<p class="product-catalogue__small-text">Test Type: <span class="product-catalogue__key">K</span></p>
+<p class="product-catalogue__small-text">Remote Testing: <span class="catalogue__circle -yes"></span></p>
+</main></body></html>"""
+
+
+class CatalogueHandler(BaseHTTPRequestHandler):
+    """Serves saved listing pages and synthetic detail pages."""
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+        parsed = urlparse(self.path)
+        if "/view/" in parsed.path:
+            slug = unquote(parsed.path.rstrip("/").rsplit("/", 1)[-1])
+            body = DETAIL_TEMPLATE.format(name=slug.replace("-", " ").title(), duration=len(slug))
+            return self._send(200, body)
+
+        start = parse_qs(parsed.query).get("start", ["0"])[0]
+        page_path = os.path.join(DEBUG_DIR, f"last_page_debug_{start}.html")
+        if not os.path.exists(page_path):
+            return self._send(404, "Not found")
+        with open(page_path, "r", encoding="utf-8") as f:
+            return self._send(200, f.read())
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        etag = '"' + hashlib.sha256(data).hexdigest()[:16] + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, delay=0.0):
+    """Start the stand-in server and block until interrupted."""
+    CatalogueHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), CatalogueHandler)
+    print(f"Serving saved catalogue pages on http://127.0.0.1:{port}/products/product-catalog/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the saved catalogue HTML locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each response")
+    args = parser.parse_args()
+    serve(port=args.port, delay=args.delay)
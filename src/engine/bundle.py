@@ -0,0 +1,119 @@
+import numpy as np
+
+from src.engine.filters import DURATION_FIELD, TYPE_FIELDS, typed_fields
+
+# Longest bundle returned, matching the ten results of the ranked mode
+BUNDLE_MAX_ITEMS = 10
+# Largest budget (minutes) and bundle size accepted from callers; they bound the DP tables
+BUNDLE_DURATION_LIMIT = 8 * 60
+BUNDLE_ITEMS_LIMIT = 50
+
+# Skill groups kept in balance: hard skills (Knowledge & Skills) and soft skills
+# (Personality & Behavior, Competencies)
+HARD_SKILL_CODES = ("K",)
+SOFT_SKILL_CODES = ("P", "C")
+HARD, SOFT = 1, 2
+
+
+def relevance_weights(n):
+    """
+    Relevance of each rank position, best first (DCG discount 1 / log2(rank + 2)).
+
+    Rank-based weights work the same for every reranker, including the LLM,
+    which orders candidates without scoring them.
+    """
+    return 1.0 / np.log2(np.arange(n) + 2.0)
+
+
+def skill_group(fields):
+    """Bitmask of the skill groups (HARD, SOFT) covered by an assessment's typed fields."""
+    group = 0
+    if any(fields[TYPE_FIELDS[code]] for code in HARD_SKILL_CODES):
+        group |= HARD
+    if any(fields[TYPE_FIELDS[code]] for code in SOFT_SKILL_CODES):
+        group |= SOFT
+    return group
+
+
+def optimize_bundle(ranked, max_duration, max_items=BUNDLE_MAX_ITEMS, balance=True):
+    """
+    Select the most relevant set of assessments that fits a total time budget.
+
+    Solves a 0/1 knapsack with an item-count cap by dynamic programming over
+    (skill groups covered, items taken, minutes used), vectorised with NumPy
+    along the count and minute axes. Untimed assessments (duration 0) cost no
+    time but still count towards max_items.
+
+    With balance, a bundle must cover every skill group (hard / soft) found
+    among the top max_items candidates, so a query whose best matches mix
+    both gets both; if no bundle within the budget can, the best unbalanced
+    bundle is returned.
+
+    Args:
+        ranked (list): Candidate assessment dictionaries, most relevant first
+        max_duration (int): Total time budget in minutes
+        max_items (int): Largest bundle size
+        balance (bool): Enforce the hard/soft skill balance
+
+    Returns:
+        tuple: (selected assessments in rank order, total duration in minutes)
+    """
+    budget = max(int(max_duration), 0)
+    fields = [typed_fields(res) for res in ranked]
+    durations = np.asarray([f[DURATION_FIELD] for f in fields], dtype=np.int64)
+    groups = np.asarray([skill_group(f) for f in fields], dtype=np.int8)
+    values = relevance_weights(len(ranked))
+
+    # Required skill groups: those of the top candidates, when balancing
+    required = 0
+    if balance:
+        for group in groups[:max_items]:
+            required |= int(group)
+
+    # An item is never needed if max_items better-ranked items are at most as long
+    # and cover at least its skill groups: one of them can always replace it
+    dominators = ((durations[None, :] <= durations[:, None])
+                  & ((groups[None, :] & groups[:, None]) == groups[:, None])
+                  & np.tri(len(ranked), k=-1, dtype=bool))
+    keep = np.flatnonzero((dominators.sum(axis=1) < max_items) & (durations <= budget))
+    # Minutes past what all kept items add up to, or counts past their number, are never reached
+    budget = min(budget, int(durations[keep].sum()))
+    max_items = min(max_items, len(keep))
+
+    # dp[covered, count, minutes] = best total relevance; -inf marks unreachable states
+    dp = np.full((4, max_items + 1, budget + 1), -np.inf)
+    dp[0, 0, 0] = 0.0
+    # choices[i][state] = covered-groups state before taking kept item i, or -1 if not taken
+    choices = np.full((len(keep),) + dp.shape, -1, dtype=np.int8)
+    reachable = {0}
+    for i, idx in enumerate(keep):
+        value, duration, group = values[idx], durations[idx], int(groups[idx])
+        updated = dp.copy()
+        for covered in sorted(reachable):
+            # Taking the item moves every (count, minutes) state up by (1, duration)
+            candidate = dp[covered, :-1, :budget + 1 - duration] + value
+            target = updated[group | covered, 1:, duration:]
+            better = candidate > target
+            target[better] = candidate[better]
+            choices[i, group | covered, 1:, duration:][better] = covered
+        reachable |= {group | covered for covered in reachable}
+        dp = updated
+
+    # Pick the best final state covering the required groups, if any bundle can
+    allowed = [covered for covered in range(4) if covered & required == required]
+    if not np.isfinite(dp[allowed].max()):
+        allowed = list(range(4))
+    best = max(allowed, key=lambda covered: dp[covered].max())
+    count, minutes = np.unravel_index(np.argmax(dp[best]), dp[best].shape)
+
+    # Walk the decisions backwards to recover the chosen items
+    covered, selected = best, []
+    for i in range(len(keep) - 1, -1, -1):
+        previous = choices[i, covered, count, minutes]
+        if previous >= 0:
+            idx = keep[i]
+            selected.append(idx)
+            covered, count, minutes = previous, count - 1, minutes - durations[idx]
+
+    selected.reverse()
+    return [ranked[idx] for idx in selected], int(durations[selected].sum())
@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from src.engine.snapshot import MANIFEST_NAME, SNAPSHOT_DIR, read_manifest
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Size and time-to-live (seconds) of each cache level
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "86400"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "1024"))
+RERANK_CACHE_TTL = float(os.getenv("RERANK_CACHE_TTL", "3600"))
+# Seconds between checks of the snapshot manifest for a rebuilt index
+INDEX_VERSION_CHECK_SECONDS = float(os.getenv("INDEX_VERSION_CHECK_SECONDS", "1"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Every cache created in this process, so they can be invalidated together
+_REGISTRY = []
+
+# Index version the cached entries were computed against, and when the manifest was last checked
+_index_state = {"checked": None, "mtime": None, "version": None}
+_index_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a fixed time-to-live.
+
+    Keeps hit/miss counters so cache effectiveness can be monitored.
+    """
+    def __init__(self, name, maxsize=1024, ttl=3600):
+        """
+        Initialize an empty cache.
+
+        Args:
+            name (str): Name reported in stats
+            maxsize (int): Maximum number of entries before the least recently used is evicted
+            ttl (float): Seconds an entry stays valid after it is stored
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _REGISTRY.append(self)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired."""
+        check_index_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries if the cache is full."""
+        if self.maxsize <= 0:
+            return
+        check_index_version()
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def normalize_query(text):
+    """Normalize query text so trivially different spellings share a cache entry."""
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+def invalidate_all():
+    """Clear every cache in this process, e.g. after the vector store has been rebuilt."""
+    for cache in _REGISTRY:
+        cache.clear()
+
+
+def check_index_version(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Clear every cache if the index snapshot has been rebuilt since the last check.
+
+    Called on every lookup, so each server worker drops entries computed
+    against an old index on its own, whichever process rebuilt it. The
+    manifest is stat'ed at most every INDEX_VERSION_CHECK_SECONDS and only
+    re-read when it has changed.
+
+    Returns:
+        str: Current snapshot version, or None if there is no snapshot
+    """
+    now = time.monotonic()
+    with _index_lock:
+        checked = _index_state["checked"]
+        if checked is not None and now - checked < INDEX_VERSION_CHECK_SECONDS:
+            return _index_state["version"]
+        _index_state["checked"] = now
+
+        try:
+            mtime = os.stat(os.path.join(snapshot_dir, MANIFEST_NAME)).st_mtime_ns
+        except OSError:
+            mtime = None
+        if checked is not None and mtime == _index_state["mtime"]:
+            return _index_state["version"]
+
+        manifest = read_manifest(snapshot_dir) if mtime is not None else None
+        version = manifest.get("version") if manifest else None
+        changed = checked is not None and version != _index_state["version"]
+        _index_state.update(mtime=mtime, version=version)
+
+    if changed:
+        print(f"Index snapshot changed to {version}; clearing caches.")
+        invalidate_all()
+    return version
+
+
+def cache_stats():
+    """Return the stats of every cache keyed by name."""
+    return {cache.name: cache.stats() for cache in _REGISTRY}
+
+
+# Normalized query text -> query embedding
+embedding_cache = TTLCache("query_embeddings", maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+# (normalized query, candidate id set, model) -> reranked id list
+rerank_cache = TTLCache("reranked_ids", maxsize=RERANK_CACHE_SIZE, ttl=RERANK_CACHE_TTL)
@@ -0,0 +1,75 @@
+import os
+
+from dotenv import load_dotenv
+from sentence_transformers import CrossEncoder
+
+from src.engine.prompt_builder import summarize
+from src.engine.reranker import BaseReranker, SOURCE_CROSS_ENCODER, SOURCE_ERROR, SOURCE_VECTOR
+
+# Load environment variables from .env file
+load_dotenv()
+
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Only the top vector hits are scored; the rest keep their vector order
+CROSS_ENCODER_MAX_CANDIDATES = int(os.getenv("CROSS_ENCODER_MAX_CANDIDATES", "50"))
+CROSS_ENCODER_BATCH_SIZE = int(os.getenv("CROSS_ENCODER_BATCH_SIZE", "32"))
+
+
+class CrossEncoderReranker(BaseReranker):
+    """
+    Local reranker scoring (query, assessment) pairs with a small cross-encoder.
+
+    Runs on CPU with no network dependency, so it is a fast alternative to the
+    Gemini reranker and a real ranking stage when no API key is configured.
+    """
+    name = SOURCE_CROSS_ENCODER
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, max_candidates=CROSS_ENCODER_MAX_CANDIDATES,
+                 batch_size=CROSS_ENCODER_BATCH_SIZE):
+        """
+        Load the cross-encoder model.
+
+        Args:
+            model_name (str): sentence-transformers cross-encoder to load
+            max_candidates (int): Number of top vector hits to score
+            batch_size (int): Pairs scored per forward pass
+        """
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, device="cpu")
+        print(f"Loaded cross-encoder ({model_name}) for reranking.")
+
+    def rerank_with_source(self, query, candidates, timeout=None):
+        """
+        Rerank candidates by cross-encoder relevance.
+
+        Args:
+            query (str): The user query
+            candidates (list): Assessment dictionaries from retrieval, best first
+            timeout (float): Unused; scoring is local and bounded by max_candidates
+
+        Returns:
+            tuple: (the 10 best assessments, each with a "rerank_score", and the source)
+        """
+        if not candidates:
+            return candidates[:10], SOURCE_VECTOR
+
+        try:
+            scored = candidates[:self.max_candidates]
+            pairs = [(query, self._candidate_text(res)) for res in scored]
+            scores = self.model.predict(pairs, batch_size=self.batch_size, convert_to_numpy=True)
+
+            ranked = sorted(zip(scores, range(len(scored))), key=lambda pair: -pair[0])
+            return [{**scored[idx], "rerank_score": float(score)} for score, idx in ranked[:10]], self.name
+
+        except Exception as e:
+            print(f"Cross-encoder Error: {e}")
+            # Fallback to vector search results on error
+            return candidates[:10], SOURCE_ERROR
+
+    @staticmethod
+    def _candidate_text(res):
+        """Text the cross-encoder compares against the query."""
+        summary = res.get('summary') or summarize(res.get('description', ''))
+        return f"{res.get('name', '')}. {res.get('test_type', '')}. {summary}"
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.engine.bundle import HARD, SOFT, skill_group
+from src.engine.filters import typed_fields
+from src.engine.numpy_index import normalize
+
+load_dotenv()
+
+# Candidates kept by the diversity stage (and passed on to the reranker); 0 disables the stage
+DIVERSITY_CANDIDATES = int(os.getenv("DIVERSITY_CANDIDATES", "20"))
+# MMR trade-off: 1.0 ranks by relevance only, lower values penalise near-duplicates more
+DIVERSITY_LAMBDA = float(os.getenv("DIVERSITY_LAMBDA", "0.7"))
+# Minimum picks per skill group (hard / soft) when the top candidates include both
+DIVERSITY_MIN_PER_GROUP = int(os.getenv("DIVERSITY_MIN_PER_GROUP", "2"))
+# Damping of the reciprocal-rank relevance, the same constant as Reciprocal Rank Fusion's
+DIVERSITY_RANK_K = 60
+
+
+def rank_relevance(results, k=DIVERSITY_RANK_K):
+    """
+    Relevance of each result from the retrieval ranking, scaled so the best is 1.
+
+    Uses the fused "rrf_score" when every result has one, otherwise the
+    reciprocal rank 1 / (k + rank + 1), so the stage keeps whatever ordering
+    produced the results (dense, hybrid or multi-vector) instead of rescoring.
+
+    Returns:
+        np.ndarray: One relevance per result, in (0, 1]
+    """
+    scores = [res.get("rrf_score") for res in results]
+    if any(score is None for score in scores):
+        scores = 1.0 / (k + np.arange(len(results)) + 1.0)
+    scores = np.asarray(scores, dtype=np.float32)
+    return scores / scores.max()
+
+
+def mmr_select(relevance, candidate_embeddings, groups, k, lambda_=DIVERSITY_LAMBDA,
+               min_per_group=DIVERSITY_MIN_PER_GROUP):
+    """
+    Pick k candidates by Maximal Marginal Relevance with skill-group quotas.
+
+    Each step takes the candidate maximising
+    lambda * relevance(c) - (1 - lambda) * max sim(c, already picked),
+    where sim is the cosine between stored vectors. The hard (K) and soft
+    (P/C) groups present among the k most relevant candidates each get at
+    least min_per_group picks: once the remaining slots are needed to meet a
+    quota, only candidates of a group still short are eligible.
+
+    Args:
+        relevance (array-like): Relevance of each candidate, higher is better (see rank_relevance)
+        candidate_embeddings (array-like): Candidate vectors, shape (n, dim)
+        groups (array-like): Skill-group bitmask of each candidate (see bundle.skill_group)
+        k (int): Number of candidates to pick
+        lambda_ (float): Relevance / novelty trade-off
+        min_per_group (int): Quota per required skill group
+
+    Returns:
+        list: Indices of the picked candidates, in pick order
+    """
+    embeddings = normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    relevance = np.asarray(relevance, dtype=np.float32)
+    groups = np.asarray(groups, dtype=np.int8)
+    n = len(embeddings)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    similarity = embeddings @ embeddings.T
+
+    # Quotas apply to the groups the most relevant candidates already span
+    top = np.argsort(-relevance, kind="stable")[:k]
+    quotas = {group: min(min_per_group, int(np.count_nonzero(groups & group)))
+              for group in (HARD, SOFT) if np.any(groups[top] & group)}
+
+    picked = []
+    available = np.ones(n, dtype=bool)
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    counts = dict.fromkeys(quotas, 0)
+    for step in range(k):
+        scores = relevance if not picked else lambda_ * relevance - (1.0 - lambda_) * max_sim
+        eligible = available.copy()
+
+        short = [group for group, quota in quotas.items() if counts[group] < quota]
+        deficit = sum(quotas[group] - counts[group] for group in short)
+        if short and k - step <= deficit:
+            eligible &= np.logical_or.reduce([(groups & group) > 0 for group in short])
+            if not eligible.any():
+                eligible = available.copy()
+
+        best = int(np.argmax(np.where(eligible, scores, -np.inf)))
+        picked.append(best)
+        available[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+        for group in counts:
+            if groups[best] & group:
+                counts[group] += 1
+
+    return picked
+
+
+def diversify(results, candidate_embeddings, k=DIVERSITY_CANDIDATES):
+    """
+    Reorder retrieval results into a smaller, balanced and non-redundant list.
+
+    Relevance comes from the incoming ranking; embeddings only measure redundancy.
+
+    Args:
+        results (list): Candidate assessment dictionaries, best first
+        candidate_embeddings (array-like): One vector per result
+        k (int): Number of results to keep
+
+    Returns:
+        list: The picked results, in MMR order
+    """
+    if not results or k <= 0:
+        return results
+    groups = [skill_group(typed_fields(res)) for res in results]
+    return [results[idx] for idx in mmr_select(rank_relevance(results), candidate_embeddings, groups, k)]
+
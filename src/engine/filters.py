@@ -0,0 +1,138 @@
+from functools import lru_cache
+
+import numpy as np
+
+from src.engine.test_types import TYPE_CODES, TYPE_LABELS, parse_test_types
+
+# Typed metadata fields stored next to the display strings, so filters run inside the index
+TYPE_FIELDS = {code: f"type_{code}" for code in TYPE_LABELS}
+DURATION_FIELD = "duration"
+REMOTE_FIELD = "is_remote"
+ADAPTIVE_FIELD = "is_adaptive"
+FILTER_FIELDS = (*TYPE_FIELDS.values(), DURATION_FIELD, REMOTE_FIELD, ADAPTIVE_FIELD)
+
+
+def parse_duration(raw):
+    """Duration in whole minutes; 0 when missing or not a number."""
+    try:
+        return int(float(raw or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def typed_fields(metadata):
+    """
+    Derive the typed filter fields from an assessment's display fields.
+
+    Args:
+        metadata (dict): Metadata with test_type, duration, remote_support and adaptive_support
+
+    Returns:
+        dict: type_<code> booleans, duration as int and is_remote / is_adaptive booleans
+    """
+    if all(field in metadata for field in FILTER_FIELDS):
+        # Already stored by vector_store
+        return {field: metadata[field] for field in FILTER_FIELDS}
+
+    codes = _codes_of(str(metadata.get("test_type", "")))
+    fields = {field: code in codes for code, field in TYPE_FIELDS.items()}
+    fields[DURATION_FIELD] = parse_duration(metadata.get("duration"))
+    fields[REMOTE_FIELD] = str(metadata.get("remote_support", "")).strip().lower() == "yes"
+    fields[ADAPTIVE_FIELD] = str(metadata.get("adaptive_support", "")).strip().lower() == "yes"
+    return fields
+
+
+@lru_cache(maxsize=256)
+def _codes_of(raw_type):
+    """Type codes of a stored test_type string (the catalogue has few distinct combinations)."""
+    return frozenset(TYPE_CODES.get(label) for label in parse_test_types(raw_type))
+
+
+def type_code(value):
+    """Accept a one-letter code ("K") or a label ("Knowledge & Skills") and return the code."""
+    value = str(value).strip()
+    if value.upper() in TYPE_LABELS:
+        return value.upper()
+    if value in TYPE_CODES:
+        return TYPE_CODES[value]
+    raise ValueError(f"Unknown test type '{value}'. Expected a code in {sorted(TYPE_LABELS)} or its label.")
+
+
+class MetadataFilter:
+    """
+    Structured search filter over the typed metadata fields.
+
+    The same filter is expressed as a ChromaDB `where` clause or as a boolean
+    row mask (for the NumPy and keyword indexes), so every backend returns
+    exactly the k best matching rows instead of over-fetching and discarding.
+    """
+    def __init__(self, types=None, max_duration=None, remote=None, adaptive=None):
+        """
+        Args:
+            types (iterable): Test type codes or labels; rows must have at least one of them
+            max_duration (int): Longest acceptable duration in minutes (untimed rows, 0, always pass)
+            remote (bool): If True, require remote testing support
+            adaptive (bool): If True, require adaptive (IRT) support
+        """
+        self.codes = sorted({type_code(t) for t in types}) if types else []
+        self.max_duration = None if max_duration is None else int(max_duration)
+        self.remote = bool(remote)
+        self.adaptive = bool(adaptive)
+
+    def __bool__(self):
+        return bool(self.codes) or self.max_duration is not None or self.remote or self.adaptive
+
+    def where(self):
+        """ChromaDB `where` clause for this filter, or None when it is empty."""
+        clauses = []
+        if self.codes:
+            type_clauses = [{TYPE_FIELDS[code]: True} for code in self.codes]
+            clauses.append(type_clauses[0] if len(type_clauses) == 1 else {"$or": type_clauses})
+        if self.max_duration is not None:
+            clauses.append({DURATION_FIELD: {"$lte": self.max_duration}})
+        if self.remote:
+            clauses.append({REMOTE_FIELD: True})
+        if self.adaptive:
+            clauses.append({ADAPTIVE_FIELD: True})
+
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def mask(self, columns):
+        """
+        Boolean row mask over typed columns.
+
+        Args:
+            columns (dict): field -> NumPy array with one entry per row (see filter_columns)
+
+        Returns:
+            np.ndarray: True for rows that pass the filter
+        """
+        mask = np.ones(len(columns[DURATION_FIELD]), dtype=bool)
+        if self.codes:
+            mask &= np.logical_or.reduce([columns[TYPE_FIELDS[code]] for code in self.codes])
+        if self.max_duration is not None:
+            mask &= columns[DURATION_FIELD] <= self.max_duration
+        if self.remote:
+            mask &= columns[REMOTE_FIELD]
+        if self.adaptive:
+            mask &= columns[ADAPTIVE_FIELD]
+        return mask
+
+
+def filter_columns(metadatas):
+    """
+    Typed filter columns for a list of metadata rows.
+
+    Fields are derived from the display strings, so indexes built before the
+    typed fields were stored can be filtered too.
+
+    Returns:
+        dict: field -> NumPy array (bool for flags, int32 for duration)
+    """
+    rows = [typed_fields(meta) for meta in metadatas]
+    return {
+        field: np.asarray([row[field] for row in rows], dtype=np.int32 if field == DURATION_FIELD else bool)
+        for field in FILTER_FIELDS
+    }
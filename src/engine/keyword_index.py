@@ -0,0 +1,123 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Very common words that carry no signal for matching assessments
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have",
+    "i", "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "we",
+    "who", "will", "with", "you", "your", "looking", "need", "want", "new"
+}
+
+
+def tokenize(text):
+    """Lowercase text and split it into BM25 terms, dropping stopwords."""
+    return [t for t in _TOKEN.findall(str(text or "").lower()) if t not in STOPWORDS]
+
+
+def assessment_text(metadata):
+    """
+    Text indexed for keyword search: name (weighted twice), URL slug and description.
+
+    The slug keeps exact product identifiers such as "automata-fix-new" searchable.
+    """
+    name = str(metadata.get('name', ''))
+    slug = str(metadata.get('url', '')).rstrip('/').rsplit('/', 1)[-1]
+    return f"{name} {name} {slug} {metadata.get('description', '')}"
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+
+    Complements the dense retriever on exact product names and rare terms that
+    sentence embeddings tend to blur.
+    """
+    def __init__(self, ids, texts, k1=1.5, b=0.75):
+        """
+        Build the inverted index.
+
+        Args:
+            ids (list): Document ids, one per text
+            texts (list): Text to index for each document
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+        """
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(lambda: ([], []))
+        doc_lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                postings[term][0].append(doc)
+                postings[term][1].append(tf)
+
+        n_docs = max(len(self.ids), 1)
+        avg_length = float(doc_lengths.mean()) if len(self.ids) else 0.0
+        # Per-document length factor of the BM25 denominator, computed once
+        length_norm = k1 * (1 - b + b * doc_lengths / (avg_length or 1.0))
+
+        # term -> (doc indices, precomputed BM25 weight per doc)
+        self.postings = {}
+        for term, (docs, tfs) in postings.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = (docs, idf * tfs * (k1 + 1) / (tfs + length_norm[docs]))
+
+    @classmethod
+    def from_metadatas(cls, ids, metadatas):
+        """Build the index over assessment metadata as stored by vector_store."""
+        return cls(ids, [assessment_text(meta) for meta in metadatas])
+
+    def search(self, query, n_results=15, mask=None):
+        """
+        Score every document against the query.
+
+        Args:
+            query (str): The search query
+            n_results (int): Maximum number of hits to return
+            mask (np.ndarray): Optional boolean mask of the documents allowed to match
+
+        Returns:
+            list: (id, score) pairs with a positive score, best first
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > n_results:
+            hits = hits[np.argpartition(-scores[hits], n_results - 1)[:n_results]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.ids[doc], float(scores[doc])) for doc in hits]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several rankings with Reciprocal Rank Fusion.
+
+    Args:
+        rankings (list): Lists of ids, each best first
+        k (int): RRF damping constant
+
+    Returns:
+        list: (id, fused score) pairs, best first
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda pair: -pair[1])
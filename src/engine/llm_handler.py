@@ -1,26 +1,48 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import asyncio
 import os
 import json
 import re
 from dotenv import load_dotenv
-from src.engine.retriever import Retriever
+from src.engine.cache import normalize_query, rerank_cache
+from src.engine.prompt_builder import build_candidate_table, estimate_tokens
+from src.engine.reranker import (BaseReranker, SOURCE_CACHE, SOURCE_ERROR, SOURCE_LLM, SOURCE_TIMEOUT,
+                                 SOURCE_VECTOR)
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Get API key from environment variables
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "models/gemini-2.5-flash"
+# Maximum number of Gemini calls in flight at once from arerank()
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Upper bound on the estimated size of a rerank prompt, in tokens
+RERANK_TOKEN_BUDGET = int(os.getenv("RERANK_TOKEN_BUDGET", "4000"))
 
 
-class LLMHandler:
+def timeout_message(timeout):
+    """Log line for an LLM call that ran out of time; timeout may be None (the client's own deadline)."""
+    if timeout is None:
+        return "LLM call timed out, falling back to vector search."
+    return f"LLM did not answer within {timeout:.2f}s, falling back to vector search."
+
+
+class LLMHandler(BaseReranker):
     """
     LLM Handler for reranking assessment search results.
 
     Uses Google's Gemini LLM to rerank assessment results based on relevance
-    to the user query, ensuring a balance of technical and soft skill assessments.
+    to the user query. The balance of technical and soft skill assessments is
+    settled before, by the retriever's diversity stage.
     """
+    name = SOURCE_LLM
+
     def __init__(self):
         """Initialize the LLM handler with Gemini model."""
+        self.model_name = GEMINI_MODEL
+        self._llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
         if not GEMINI_API_KEY:
             print("WARNING: GEMINI_API_KEY not found in environment variables.")
             print("LLM Reranking will be skipped (returning raw vector results).")
@@ -31,33 +53,111 @@ class LLMHandler:
         genai.configure(api_key=GEMINI_API_KEY)
 
         # Initialize the Gemini model
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+        self.model = genai.GenerativeModel(self.model_name)
         print("Connected to Gemini LLM (gemini-2.5-flash) for reranking.")
 
-    def rerank(self, query, results):
+    def rerank_with_source(self, query, candidates, timeout=None):
         """
-        Rerank assessment results using LLM.
+        Rerank synchronously like rerank(), also reporting which path produced the ranking.
+
+        Args:
+            query (str): The user query
+            candidates (list): Assessment dictionaries from retrieval, best first
+            timeout (float): Seconds to wait for the LLM before falling back to vector order
+
+        Returns:
+            tuple: (reranked list, source) where source is one of SOURCE_LLM,
+                   SOURCE_CACHE, SOURCE_VECTOR, SOURCE_ERROR or SOURCE_TIMEOUT
+        """
+        # Return raw candidates if LLM is not available or candidates are empty
+        if not self.model or not candidates:
+            return candidates[:10], SOURCE_VECTOR
+
+        # Reuse an earlier ranking of the same query over the same candidates
+        cache_key = self._cache_key(query, candidates)
+        cached = self._from_cache(cache_key, candidates)
+        if cached is not None:
+            return cached, SOURCE_CACHE
+
+        # No time left for a round trip at all
+        if timeout is not None and timeout <= 0:
+            return candidates[:10], SOURCE_TIMEOUT
+
+        try:
+            # Generate response from LLM
+            request_options = {"timeout": timeout} if timeout else None
+            response = self.model.generate_content(self._build_prompt(query, candidates),
+                                                   request_options=request_options)
+            return self._select(response.text, candidates, cache_key)
+
+        except google_exceptions.DeadlineExceeded:
+            print(timeout_message(timeout))
+            return candidates[:10], SOURCE_TIMEOUT
+
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            # Fallback to vector search candidates on error
+            return candidates[:10], SOURCE_ERROR
+
+    async def arerank_with_source(self, query, candidates, timeout=None):
+        """
+        Rerank like arerank(), also reporting which path produced the ranking.
+
+        When the timeout expires the LLM call is cancelled and the vector
+        ranking is returned, so a slow Gemini response cannot hold the request.
 
         Args:
             query (str): The user query
-            results (list): List of assessment dictionaries from vector search
+            candidates (list): Assessment dictionaries from retrieval, best first
+            timeout (float): Seconds to wait for the LLM before falling back to vector order
 
         Returns:
-            list: Reranked list of assessment dictionaries
+            tuple: (reranked list, source) where source is one of SOURCE_LLM,
+                   SOURCE_CACHE, SOURCE_VECTOR, SOURCE_ERROR or SOURCE_TIMEOUT
         """
-        # Return raw results if LLM is not available or results are empty
-        if not self.model or not results:
-            return results[:10]
+        # Return raw candidates if LLM is not available or candidates are empty
+        if not self.model or not candidates:
+            return candidates[:10], SOURCE_VECTOR
 
-        # Format assessment data for the prompt
-        result_texts = ""
-        for idx, res in enumerate(results):
-            result_texts += f"{idx + 1}. Assessment Name: {res['name']}\n"
-            result_texts += f"   Type: {res['test_type']}\n"
-            result_texts += f"   Description: {str(res.get('description', ''))[:500]}\n\n"
+        # Reuse an earlier ranking of the same query over the same candidates
+        cache_key = self._cache_key(query, candidates)
+        cached = self._from_cache(cache_key, candidates)
+        if cached is not None:
+            return cached, SOURCE_CACHE
 
+        # No time left for a round trip at all
+        if timeout is not None and timeout <= 0:
+            return candidates[:10], SOURCE_TIMEOUT
+
+        try:
+            # Generate response from LLM, bounded so bursts do not trip rate limits
+            response = await asyncio.wait_for(self._generate_async(self._build_prompt(query, candidates)),
+                                              timeout=timeout)
+            return self._select(response.text, candidates, cache_key)
+
+        except (asyncio.TimeoutError, google_exceptions.DeadlineExceeded):
+            print(timeout_message(timeout))
+            return candidates[:10], SOURCE_TIMEOUT
+
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            # Fallback to vector search candidates on error
+            return candidates[:10], SOURCE_ERROR
+
+    async def _generate_async(self, prompt):
+        """Call Gemini's async API while holding one of the concurrency slots."""
+        async with self._llm_slots:
+            return await self.model.generate_content_async(prompt)
+
+    def _build_prompt(self, query, results):
+        """
+        Build the reranking prompt within RERANK_TOKEN_BUDGET.
+
+        Candidates are listed as a compact table (id, name, type codes, duration,
+        short summary); lower-ranked candidates are dropped once the budget is spent.
+        """
         # Create prompt for the LLM
-        prompt = f"""
+        template = """
                 You are an expert SHL Assessment Recruiter.
 
                 USER QUERY: "{query}"
@@ -67,61 +167,76 @@ class LLMHandler:
                 Try to take as many relevant assignments as possible.
 
                 CRITICAL RULES:
-                1. BALANCE: If the query asks for both hard skills (e.g., coding, analysis) and soft skills (e.g., leadership, personality), you MUST pick a mix of 'Knowledge & Skills' and 'Personality & Behavior'/'Competencies' tests.
-                2. ACCURACY: Only choose assessments that are genuinely relevant to the query.
-                3. OUTPUT FORMAT: Return ONLY a valid JSON array of the integer IDs of your selected choices (e.g. [0, 2, 4]). Do not write any other text.
+                1. ACCURACY: Only choose assessments that are genuinely relevant to the query.
+                2. OUTPUT FORMAT: Return ONLY a valid JSON array of the integer ids of your selected choices (e.g. [0, 2, 4]). Do not write any other text.
 
                 CANDIDATE LIST:
-                {result_texts}
+{candidates}
                 """
+        base = template.format(query=query, candidates="")
+        candidates, _ = build_candidate_table(results, RERANK_TOKEN_BUDGET - estimate_tokens(base))
+        return template.format(query=query, candidates=candidates)
 
-        try:
-            # Generate response from LLM
-            response = self.model.generate_content(prompt)
-
-            # Parse the LLM response to extract the JSON array
-            text = response.text
-            # Use regex to find the list part [ ... ]
-            match = re.search(r'\[.*\]', text, re.DOTALL)
-
-            if match:
-                clean_text = match.group(0)
-                selected_indices = json.loads(clean_text)
-            else:
-                # Fallback cleaning if regex fails
-                clean_text = text.strip().replace("```json", "").replace("```", "")
-                selected_indices = json.loads(clean_text)
-
-            # Process the selected indices to create the final results
-            final_results = []
-            already_added = set()
-            for idx in selected_indices:
-                if isinstance(idx, int) and 0 <= idx < len(results):
-                    final_results.append(results[idx])
-                    already_added.add(idx)
-
-            # Fallback to vector search if LLM returns no valid matches
-            if not final_results:
-                print("LLM returned no matches, falling back to vector search.")
-                return results[:10]
-
-            # Ensure we have at least 5 results by adding from vector search
-            if len(final_results) < 5:
-                for idx, res in enumerate(results):
-                    if idx not in already_added:
-                        final_results.append(res)
-                    if len(final_results) >= 10:
-                        break
-
-            return final_results
+    def _select(self, text, results, cache_key):
+        """
+        Turn the LLM response text into the final list of assessments.
 
-        except Exception as e:
-            print(f"LLM Error: {e}")
-            # Fallback to vector search results on error
-            return results[:10]
+        Raises on unparseable responses so callers can fall back to vector order.
+
+        Returns:
+            tuple: (final list, source)
+        """
+        # Use regex to find the list part [ ... ]
+        match = re.search(r'\[.*\]', text, re.DOTALL)
+
+        if match:
+            clean_text = match.group(0)
+            selected_indices = json.loads(clean_text)
+        else:
+            # Fallback cleaning if regex fails
+            clean_text = text.strip().replace("```json", "").replace("```", "")
+            selected_indices = json.loads(clean_text)
+
+        # Process the selected indices to create the final results
+        final_results = []
+        already_added = set()
+        for idx in selected_indices:
+            if isinstance(idx, int) and 0 <= idx < len(results):
+                final_results.append(results[idx])
+                already_added.add(idx)
+
+        # Fallback to vector search if LLM returns no valid matches
+        if not final_results:
+            print("LLM returned no matches, falling back to vector search.")
+            return results[:10], SOURCE_VECTOR
+
+        # Ensure we have at least 5 results by adding from vector search
+        if len(final_results) < 5:
+            for idx, res in enumerate(results):
+                if idx not in already_added:
+                    final_results.append(res)
+                if len(final_results) >= 10:
+                    break
+
+        rerank_cache.set(cache_key, [res['id'] for res in final_results])
+        return final_results, SOURCE_LLM
+
+    def _from_cache(self, cache_key, results):
+        """Rebuild a cached ranking from the current candidates, or return None on a miss."""
+        cached_ids = rerank_cache.get(cache_key)
+        if cached_ids is None:
+            return None
+        by_id = {res['id']: res for res in results}
+        return [by_id[i] for i in cached_ids if i in by_id]
+
+    def _cache_key(self, query, results):
+        """Build the rerank cache key: normalized query, candidate id set and model."""
+        return (normalize_query(query), frozenset(res.get('id') for res in results), self.model_name)
 
 
 if __name__ == "__main__":
+    from src.engine.retriever import Retriever
+
     # Test the LLM handler with a sample query
     primary_matches = Retriever().search("I need a Java developer who is good at teamwork")
 
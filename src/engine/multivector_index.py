@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.engine.numpy_index import NumpyIndex, normalize
+from src.engine.query_understanding import chunk_text
+from src.engine.snapshot import SNAPSHOT_DIR, load_fields, load_snapshot
+from src.engine.test_types import parse_test_types
+
+load_dotenv()
+
+# Fields embedded separately for every assessment; kinds index FIELDS
+FIELDS = ("name", "type", "description")
+FIELD_NAME, FIELD_TYPE, FIELD_DESCRIPTION = range(len(FIELDS))
+# Weight of each field's best matching vector in an assessment's score
+FIELD_WEIGHTS = (
+    float(os.getenv("FIELD_WEIGHT_NAME", "0.35")),
+    float(os.getenv("FIELD_WEIGHT_TYPE", "0.15")),
+    float(os.getenv("FIELD_WEIGHT_DESCRIPTION", "0.5")),
+)
+# Descriptions are embedded in full, as overlapping chunks under the model's 256 word-piece limit
+DESCRIPTION_CHUNK_WORDS = int(os.getenv("DESCRIPTION_CHUNK_WORDS", "100"))
+DESCRIPTION_CHUNK_OVERLAP = int(os.getenv("DESCRIPTION_CHUNK_OVERLAP", "20"))
+
+
+def field_texts(metadata):
+    """
+    Texts embedded for an assessment, one per field vector.
+
+    Args:
+        metadata (dict): Assessment metadata with name, test_type and description
+
+    Returns:
+        list: (field kind, text) pairs; the description gives one pair per chunk
+    """
+    pairs = [(FIELD_NAME, str(metadata.get("name", "")).strip())]
+    labels = parse_test_types(metadata.get("test_type"))
+    if labels:
+        pairs.append((FIELD_TYPE, ", ".join(labels)))
+    description = str(metadata.get("description", "")).strip()
+    if description:
+        pairs += [(FIELD_DESCRIPTION, chunk)
+                  for chunk in chunk_text(description, DESCRIPTION_CHUNK_WORDS, DESCRIPTION_CHUNK_OVERLAP,
+                                          max_chunks=None)]
+    return [(kind, text) for kind, text in pairs if text]
+
+
+def embed_fields(metadatas, embed_func, known=None):
+    """
+    Embed every field of every assessment into one contiguous matrix.
+
+    Vectors are grouped by field kind, then by row, which is the layout
+    MultiVectorIndex scores with segment reductions. Identical texts (type
+    label combinations are shared by many assessments) are embedded once.
+
+    Args:
+        metadatas (list): Metadata dictionaries, one per row
+        embed_func (callable): Embedding function (list of texts -> list of vectors)
+        known (dict): text -> vector from an earlier build, reused instead of re-embedding
+
+    Returns:
+        tuple: (field embeddings of shape (m, dim), owner rows, field kinds, texts)
+    """
+    entries = [(kind, row, text) for row, metadata in enumerate(metadatas) for kind, text in field_texts(metadata)]
+    # Stable sort keeps description chunks in reading order within a row
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+    texts = [text for _, _, text in entries]
+
+    vectors = dict(known or {})
+    missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+    if missing:
+        vectors.update(zip(missing, embed_func(missing)))
+
+    matrix = normalize(np.asarray([vectors[text] for text in texts], dtype=np.float32))
+    rows = np.asarray([row for _, row, _ in entries], dtype=np.int32)
+    kinds = np.asarray([kind for kind, _, _ in entries], dtype=np.int8)
+    return matrix, rows, kinds, texts
+
+
+class MultiVectorIndex(NumpyIndex):
+    """
+    Exact-search index with several vectors per assessment.
+
+    Each assessment has a vector for its name, one for its type labels and
+    one per description chunk. A query scores an assessment by weighted late
+    interaction: for each field the best matching vector's similarity,
+    weighted by FIELD_WEIGHTS and normalised over the fields the assessment
+    has. All field vectors sit in one contiguous matrix, so a query costs one
+    matrix product plus a segment max per field.
+    """
+    def __init__(self, ids, embeddings, documents, metadatas, field_embeddings, field_rows, field_kinds,
+                 normalized=False, weights=FIELD_WEIGHTS):
+        """
+        Args:
+            ids, embeddings, documents, metadatas, normalized: As for NumpyIndex
+            field_embeddings (array-like): Field vectors of shape (m, dim), grouped
+                                           by field kind then row (see embed_fields)
+            field_rows (array-like): Row owning each field vector
+            field_kinds (array-like): Field kind (index into FIELDS) of each vector
+            weights (tuple): Weight of each field kind
+        """
+        super().__init__(ids, embeddings, documents, metadatas, normalized=normalized)
+        self.field_rows = np.asarray(field_rows, dtype=np.int64)
+        self.field_kinds = np.asarray(field_kinds, dtype=np.int8)
+        if normalized:
+            self.field_embeddings = field_embeddings
+        else:
+            self.field_embeddings = normalize(np.asarray(field_embeddings, dtype=np.float32))
+        self.weights = np.asarray(weights, dtype=np.float32)
+
+        # Reorder only if the vectors are not already grouped (a snapshot always is)
+        order = np.lexsort((self.field_rows, self.field_kinds))
+        if np.any(order != np.arange(len(order))):
+            self.field_rows, self.field_kinds = self.field_rows[order], self.field_kinds[order]
+            self.field_embeddings = np.ascontiguousarray(self.field_embeddings[order])
+
+        # Per field kind: its column range and the start of each row's run of vectors
+        self._segments = []
+        for kind in range(len(FIELDS)):
+            columns = np.flatnonzero(self.field_kinds == kind)
+            if not len(columns):
+                continue
+            start, stop = int(columns[0]), int(columns[-1]) + 1
+            rows = self.field_rows[start:stop]
+            run_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            self._segments.append((kind, start, stop, run_starts, rows[run_starts]))
+
+        # Sum of the weights of the fields each row has, so a missing field does not count against it
+        present = np.zeros((len(self.ids), len(FIELDS)), dtype=bool)
+        present[self.field_rows, self.field_kinds] = True
+        self._weight_totals = present @ self.weights
+        self._weight_totals[self._weight_totals == 0] = 1.0
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir=SNAPSHOT_DIR, model_name=None):
+        """
+        Open the on-disk snapshot written by vector_store, memory-mapped read-only.
+
+        Returns:
+            MultiVectorIndex: The index, or None if no compatible snapshot with
+                              per-field vectors exists
+        """
+        snapshot = load_snapshot(snapshot_dir, model_name=model_name)
+        if snapshot is None:
+            return None
+        manifest, embeddings, ids, documents, metadatas = snapshot
+        fields = load_fields(snapshot_dir, manifest)
+        if fields is None:
+            return None
+        field_embeddings, field_rows, field_kinds, _ = fields
+        index = cls(ids, embeddings, documents, metadatas, field_embeddings, field_rows, field_kinds,
+                    normalized=True)
+        index.manifest = manifest
+        return index
+
+    def similarities(self, queries):
+        """
+        Weighted late-interaction score of every row for every query.
+
+        Scores lie in [-1, 1] like cosine similarities, so search() reports
+        distances on the same scale as the single-vector index.
+
+        Args:
+            queries (np.ndarray): Unit-length query vectors of shape (q, dim)
+
+        Returns:
+            np.ndarray: Scores of shape (q, n)
+        """
+        sims = queries @ self.field_embeddings.T
+        scores = np.zeros((len(queries), len(self.ids)), dtype=np.float32)
+        for kind, start, stop, run_starts, rows in self._segments:
+            # Best vector of this field for each row that has it
+            best = np.maximum.reduceat(sims[:, start:stop], run_starts, axis=1)
+            scores[:, rows] += self.weights[kind] * best
+        return scores / self._weight_totals
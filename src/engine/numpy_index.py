@@ -0,0 +1,123 @@
+import numpy as np
+
+from src.engine.filters import filter_columns
+from src.engine.snapshot import SNAPSHOT_DIR, load_snapshot
+
+
+class NumpyIndex:
+    """
+    In-process exact-search index over a normalized embedding matrix.
+
+    The whole catalogue is small enough (a few hundred rows) that a brute-force
+    matrix product beats the SQLite + HNSW path of ChromaDB, both at startup
+    and per query.
+    """
+    def __init__(self, ids, embeddings, documents, metadatas, normalized=False):
+        """
+        Build the index from embeddings and their metadata arrays.
+
+        Args:
+            ids (list): Assessment ids, one per row
+            embeddings (array-like): Embedding matrix of shape (n, dim)
+            documents (list): Indexed text, one per row
+            metadatas (list): Metadata dictionaries, one per row
+            normalized (bool): Rows are already unit-length float32; use the
+                               matrix as is (keeps memory-mapped snapshots shared)
+        """
+        self.ids = list(ids)
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.manifest = None
+        # Typed columns (type flags, duration, remote/adaptive) for filtered searches
+        self.filter_columns = filter_columns(self.metadatas)
+        if normalized:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+
+    @classmethod
+    def from_collection(cls, collection):
+        """Load every row of a ChromaDB collection into memory once."""
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        return cls(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir=SNAPSHOT_DIR, model_name=None):
+        """
+        Open the on-disk snapshot written by vector_store, memory-mapped read-only.
+
+        Returns:
+            NumpyIndex: The index, or None if no compatible snapshot exists
+        """
+        snapshot = load_snapshot(snapshot_dir, model_name=model_name)
+        if snapshot is None:
+            return None
+        manifest, embeddings, ids, documents, metadatas = snapshot
+        index = cls(ids, embeddings, documents, metadatas, normalized=True)
+        index.manifest = manifest
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query_embeddings, n_results=15, metadata_filter=None):
+        """
+        Find the nearest rows for each query embedding.
+
+        Args:
+            query_embeddings (array-like): Query vectors of shape (q, dim)
+            n_results (int): Number of results to return per query
+            metadata_filter (MetadataFilter): Optional filter; only matching rows are ranked
+
+        Returns:
+            list: One list of (row, distance) pairs per query, best first.
+                  Distances are squared L2 between unit vectors, the same
+                  scale ChromaDB reports, so lower is better.
+        """
+        queries = normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        mask = metadata_filter.mask(self.filter_columns) if metadata_filter else None
+        k = min(n_results, len(self.ids) if mask is None else int(mask.sum()))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        sims = self.similarities(queries)
+        if mask is not None:
+            # Excluded rows can never enter the top k
+            sims[:, ~mask] = -np.inf
+
+        # Select the top k without sorting the full row, then order just those
+        if k < sims.shape[1]:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(sims.shape[1]), sims.shape)
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        distances = 2.0 - 2.0 * top_sims
+        return [
+            [(int(row), float(dist)) for row, dist in zip(rows, dists)]
+            for rows, dists in zip(top, distances)
+        ]
+
+    def similarities(self, queries):
+        """
+        Cosine similarity of every row to every query.
+
+        Args:
+            queries (np.ndarray): Unit-length query vectors of shape (q, dim)
+
+        Returns:
+            np.ndarray: Similarities of shape (q, n)
+        """
+        # One matrix product scores every row against every query
+        return queries @ self.embeddings.T
+
+
+def normalize(matrix):
+    """Scale each row of a matrix to unit length (zero rows are left as is)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
@@ -0,0 +1,91 @@
+import math
+import re
+
+from src.engine.test_types import TYPE_LABELS, type_codes
+
+# Words kept from each description when summarizing at index time
+SUMMARY_WORDS = 20
+# Rough characters-per-token ratio used to estimate prompt size without a tokenizer
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"\s+")
+_CELL_UNSAFE = re.compile(r"[|\n\r]+")
+
+
+def estimate_tokens(text):
+    """Estimate the number of LLM tokens in a piece of text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def summarize(description, max_words=SUMMARY_WORDS):
+    """
+    Build a short, token-bounded summary of an assessment description.
+
+    Keeps whole leading sentences while they fit in max_words, and otherwise
+    truncates the first sentence.
+
+    Args:
+        description (str): Full assessment description
+        max_words (int): Maximum number of words in the summary
+
+    Returns:
+        str: The summary
+    """
+    text = _WHITESPACE.sub(" ", str(description or "")).strip()
+    if not text:
+        return ""
+
+    summary_words = []
+    for sentence in _SENTENCE_END.split(text):
+        words = sentence.split()
+        if summary_words and len(summary_words) + len(words) > max_words:
+            break
+        summary_words.extend(words)
+        if len(summary_words) >= max_words:
+            break
+
+    return " ".join(summary_words[:max_words])
+
+
+def candidate_row(idx, res):
+    """Encode one candidate as a compact table row: id|name|types|minutes|summary."""
+    summary = res.get('summary') or summarize(res.get('description', ''))
+    try:
+        duration = int(float(res.get('duration', 0) or 0))
+    except (TypeError, ValueError):
+        duration = 0
+    cells = [str(idx), str(res.get('name', '')), type_codes(res.get('test_type', '')),
+             str(duration) if duration else "-", summary]
+    return "|".join(_CELL_UNSAFE.sub(" ", cell) for cell in cells)
+
+
+def build_candidate_table(results, token_budget):
+    """
+    Encode candidates as a compact table that fits in a token budget.
+
+    Candidates are added in vector rank order until the budget is used up,
+    so the best matches are always included.
+
+    Args:
+        results (list): Candidate assessment dictionaries, best first
+        token_budget (int): Maximum estimated tokens for the table
+
+    Returns:
+        tuple: (table text, number of candidates included)
+    """
+    legend = "Type codes: " + ", ".join(f"{code}={label}" for code, label in sorted(TYPE_LABELS.items()))
+    lines = [legend, "id|name|types|minutes|summary"]
+    used = sum(estimate_tokens(line) + 1 for line in lines)
+
+    included = 0
+    for idx, res in enumerate(results):
+        row = candidate_row(idx, res)
+        cost = estimate_tokens(row) + 1
+        if included and used + cost > token_budget:
+            break
+        lines.append(row)
+        used += cost
+        included += 1
+
+    return "\n".join(lines), included
@@ -0,0 +1,300 @@
+import ipaddress
+import os
+import re
+import socket
+import time
+from urllib.parse import urljoin, urlsplit
+
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+from src.engine.cache import QUERY_CACHE_TTL, TTLCache
+from src.engine.numpy_index import normalize
+
+load_dotenv()
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces: chunks of ~150 words stay under it
+QUERY_CHUNK_WORDS = int(os.getenv("QUERY_CHUNK_WORDS", "150"))
+QUERY_CHUNK_OVERLAP = int(os.getenv("QUERY_CHUNK_OVERLAP", "25"))
+# Upper bound on chunks embedded per query, so a very long description has a bounded cost
+QUERY_MAX_CHUNKS = int(os.getenv("QUERY_MAX_CHUNKS", "8"))
+# How chunk vectors are combined: "mean" (one query vector) or "max" (best chunk per assessment)
+QUERY_AGGREGATION = os.getenv("QUERY_AGGREGATION", "mean").lower()
+AGGREGATIONS = ("mean", "max")
+# Fetch the posting when the whole query is a URL (otherwise the words of the URL are used).
+# Off by default: the server would request any URL a caller sends
+QUERY_FETCH_URLS = os.getenv("QUERY_FETCH_URLS", "0").lower() in ("1", "true", "yes")
+QUERY_URL_TIMEOUT = float(os.getenv("QUERY_URL_TIMEOUT", "5"))
+# Comma-separated hosts (and their subdomains) postings may be fetched from; empty allows any public host
+QUERY_URL_HOSTS = [h.strip().lower() for h in os.getenv("QUERY_URL_HOSTS", "").split(",") if h.strip()]
+QUERY_URL_MAX_REDIRECTS = 3
+# Apply an extracted time limit as a max_duration filter when the caller set none.
+# Off by default: the limit is only reported, as a misread one would silently drop assessments
+QUERY_APPLY_DURATION = os.getenv("QUERY_APPLY_DURATION", "0").lower() in ("1", "true", "yes")
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+
+# Time limits: "40 minutes", "30-40 mins", "1-2 hour", "about an hour", "90 min"
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_DURATION_RE = re.compile(
+    rf"\b(?:{_NUMBER}\s*(?:-|–|to|or)\s*)?(?P<amount>\d+(?:\.\d+)?|half an?|an?)\s*"
+    rf"(?P<unit>hours?|hrs?|minutes?|mins?)\b",
+    re.IGNORECASE
+)
+# A time mention is a limit only when its sentence names the assessment close by ("test should
+# be 30 mins long"), or when a limit phrase leads straight into it ("time limit is less than 30 minutes")
+_ASSESSMENT_RE = re.compile(r"\b(?:asses\w*|tests?\b(?![- ]?driven)|exams?|quiz(?:zes)?|questionnaires?)",
+                            re.IGNORECASE)
+_LIMIT_CUES = ("within", "max", "more than", "less than", "at most", "up to", "upto", "under",
+               "limit", "duration", "budget")
+_CUE_WINDOW = 60
+_LEAD_WINDOW = 25
+# Rates ("40 hours per week") describe the job, not the assessment
+_RATE_RE = re.compile(r"\s*(?:per|a|an|each|every|/)\s*(?:day|week|month|year|shift)\b", re.IGNORECASE)
+# Minimums ("at least 30 mins") are not limits
+_MINIMUM_CUES = ("at least", "atleast", "minimum", "no less than")
+
+# Test type hints: phrases naming a kind of assessment, mapped to catalogue type codes
+TYPE_HINTS = {
+    "A": ("cognitive", "aptitude", "reasoning", "numerical ability", "verbal ability"),
+    "B": ("situational judgement", "situational judgment", "biodata"),
+    "C": ("competenc",),
+    "P": ("personality", "behavio", "cultural fit", "culturally"),
+    "S": ("simulation",),
+    "K": ("technical skill", "knowledge test", "coding test", "programming test"),
+}
+
+
+class QueryPlan:
+    """
+    A query prepared for retrieval.
+
+    Holds the text to search for (URL postings fetched, stray URLs removed),
+    the chunks to embed, and the constraints found in the text.
+    """
+    def __init__(self, query, text, chunks, max_duration=None, types=None):
+        """
+        Args:
+            query (str): The query as received
+            text (str): Cleaned query text, used by the keyword index
+            chunks (list): Texts to embed; one chunk for short queries
+            max_duration (int): Time limit in minutes stated in the query, if any
+            types (list): Test type codes hinted at by the query
+        """
+        self.query = query
+        self.text = text
+        self.chunks = chunks
+        self.max_duration = max_duration
+        self.types = types or []
+
+    def constraints(self):
+        """Extracted constraints as a JSON-friendly dictionary."""
+        return {"max_duration": self.max_duration, "types": self.types, "chunks": len(self.chunks)}
+
+
+def is_url(query):
+    """True if the whole query is a single URL."""
+    return bool(URL_RE.fullmatch(query.strip()))
+
+
+def url_words(url):
+    """Readable words of a URL's path, e.g. ".../jobs/senior-java-developer-1234" -> "jobs senior java developer"."""
+    path = re.sub(r"^(?:https?://)?(?:www\.)?[^/]+", "", url.strip(), flags=re.IGNORECASE)
+    path = re.sub(r"[?#].*$", "", path)
+    return " ".join(w for w in re.split(r"[/\-_.+]+", path) if w.isalpha())
+
+
+# URL -> text of successfully fetched postings
+posting_cache = TTLCache("query_postings", maxsize=128, ttl=QUERY_CACHE_TTL)
+
+
+def is_fetchable(url):
+    """
+    True if a posting may be fetched from url.
+
+    The scheme must be http(s), the host must be in QUERY_URL_HOSTS when that
+    is set, and every address the host resolves to must be public, so queries
+    cannot reach loopback, private, link-local (cloud metadata) or reserved
+    addresses.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    if QUERY_URL_HOSTS and not any(host == h or host.endswith(f".{h}") for h in QUERY_URL_HOSTS):
+        return False
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or parts.scheme,
+                                                               proto=socket.IPPROTO_TCP)}
+        return bool(addresses) and all(ipaddress.ip_address(a.split("%")[0]).is_global for a in addresses)
+    except (OSError, ValueError):
+        return False
+
+
+def fetch_posting(url, timeout=QUERY_URL_TIMEOUT):
+    """
+    Visible text of a job posting page.
+
+    Args:
+        url (str): Posting URL (the scheme defaults to https)
+        timeout (float): Seconds the whole fetch, redirects included, may take
+
+    Returns:
+        str: Page text, or "" if the page could not or may not be fetched
+    """
+    url = url if "://" in url else f"https://{url}"
+    text = posting_cache.get(url)
+    if text is not None:
+        return text
+    if timeout <= 0:
+        return ""
+    try:
+        text = _fetch_posting(url, timeout)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Could not fetch query URL {url}: {e}")
+        return ""
+    # Only successful fetches are cached, so a briefly unreachable posting is tried again
+    posting_cache.set(url, text)
+    return text
+
+
+def _fetch_posting(url, timeout):
+    """Fetch and strip a posting, checking every redirect target; raises on failure."""
+    deadline = time.monotonic() + timeout
+    for _ in range(QUERY_URL_MAX_REDIRECTS + 1):
+        if not is_fetchable(url):
+            raise ValueError("URL is not a public, allowed host")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"no time left after {timeout:.2f}s")
+        response = requests.get(url, timeout=remaining, allow_redirects=False,
+                                headers={"User-Agent": "Mozilla/5.0"})
+        if not response.is_redirect:
+            break
+        url = urljoin(url, response.headers["Location"])
+    else:
+        raise requests.TooManyRedirects(f"more than {QUERY_URL_MAX_REDIRECTS} redirects")
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    for tag in soup(["script", "style", "noscript", "header", "footer", "nav"]):
+        tag.decompose()
+    return soup.get_text(" ", strip=True)
+
+
+def clean_text(query, fetch_urls=QUERY_FETCH_URLS, timeout=QUERY_URL_TIMEOUT):
+    """
+    Text to retrieve with for a query.
+
+    A query that is only a URL is replaced by the posting's text (or the words
+    of its path when it cannot be fetched); URLs inside longer text are dropped.
+    """
+    query = query.strip()
+    if is_url(query):
+        text = fetch_posting(query, timeout=timeout) if fetch_urls else ""
+        return text or url_words(query)
+    return URL_RE.sub(" ", query).strip()
+
+
+def chunk_text(text, chunk_words=QUERY_CHUNK_WORDS, overlap=QUERY_CHUNK_OVERLAP, max_chunks=QUERY_MAX_CHUNKS):
+    """
+    Split text into overlapping word windows that fit the embedding model.
+
+    Texts no longer than chunk_words come back as a single chunk, unchanged.
+    Longer texts are cut into windows of chunk_words words that overlap by
+    overlap words; past max_chunks windows (None for no limit), evenly
+    spaced ones are kept so the whole text is still covered.
+
+    Returns:
+        list: Chunk strings
+    """
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [text]
+
+    step = max(chunk_words - overlap, 1)
+    starts = list(range(0, len(words) - overlap, step))
+    if max_chunks and len(starts) > max_chunks:
+        starts = [starts[i] for i in np.linspace(0, len(starts) - 1, max_chunks).round().astype(int)]
+    return [" ".join(words[start:start + chunk_words]) for start in starts]
+
+
+def _minutes(value, unit):
+    """Minutes for a number (or "a"/"an"/"half an") and a time unit."""
+    value = value.lower()
+    amount = 0.5 if value.startswith("half") else 1.0 if value in ("a", "an") else float(value)
+    return amount * (60 if unit.lower().startswith("h") else 1)
+
+
+def extract_duration(text):
+    """
+    Time limit in minutes stated for the assessment, if any.
+
+    A time mention counts only when the same sentence names the assessment
+    ("test", "assessment", ...; not "test-driven") near it, or when a limit
+    phrase such as "within" or "less than" leads into it. Shift lengths, rates
+    ("40 hours per week") and minimums ("at least 30 mins") are skipped. Ranges
+    give their upper bound ("30 to an hour" is 60), and with several limits
+    the most generous is kept.
+
+    Returns:
+        int: Minutes, or None
+    """
+    limits = []
+    for sentence in re.split(r"(?<=[.!?;])\s+|\n+", text):
+        lowered = sentence.lower()
+        for match in _DURATION_RE.finditer(sentence):
+            start, end = match.span()
+            lead = lowered[max(start - _LEAD_WINDOW, 0):start]
+            window = sentence[max(start - _CUE_WINDOW, 0):end + _CUE_WINDOW]
+            if not (_ASSESSMENT_RE.search(window) or any(cue in lead for cue in _LIMIT_CUES)):
+                continue
+            if _RATE_RE.match(sentence, end) or any(cue in lead for cue in _MINIMUM_CUES):
+                continue
+            limits.append(_minutes(match.group("amount"), match.group("unit")))
+    return int(round(max(limits))) if limits else None
+
+
+def extract_types(text):
+    """
+    Test type codes hinted at by the query, e.g. ["A", "P"] for "cognitive and personality tests".
+
+    Only sentences about the assessment itself are read, so words like
+    "behaviour" in the body of a job description do not count.
+    """
+    sentences = [s for s in re.split(r"[.!?\n]+", text.lower()) if "test" in s or "assess" in s]
+    return [code for code, hints in TYPE_HINTS.items()
+            if any(hint in sentence for sentence in sentences for hint in hints)]
+
+
+def understand(query, fetch_urls=QUERY_FETCH_URLS, url_timeout=QUERY_URL_TIMEOUT):
+    """
+    Prepare a query for retrieval: resolve URLs, chunk long text and extract constraints.
+
+    Not cached itself: fetching a URL query can block on the network, so it
+    runs with the search on the embedding executor, and only successfully
+    fetched postings are cached (see fetch_posting).
+
+    Args:
+        query (str): The raw query, from a short request to a full job description or URL
+        fetch_urls (bool): Fetch postings for URL queries
+        url_timeout (float): Seconds a posting fetch may take, e.g. what is left of a request's deadline
+
+    Returns:
+        QueryPlan: The prepared query
+    """
+    text = clean_text(query, fetch_urls=fetch_urls, timeout=url_timeout) or query.strip()
+    # Constraints are written by the requester, so they are read from the query, not a fetched page
+    source = query if not is_url(query) else ""
+    return QueryPlan(query, text, chunk_text(text),
+                     max_duration=extract_duration(source), types=extract_types(source))
+
+
+def aggregate(chunk_embeddings):
+    """Mean of unit-normalised chunk vectors, normalised again: one vector covering every chunk."""
+    if len(chunk_embeddings) == 1:
+        return chunk_embeddings[0]
+    chunk_embeddings = normalize(np.asarray(chunk_embeddings, dtype=np.float32))
+    return normalize(chunk_embeddings.mean(axis=0, keepdims=True))[0]
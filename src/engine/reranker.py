@@ -0,0 +1,94 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from functools import partial
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Reranking stage used when none is requested explicitly: "llm" or "cross-encoder"
+RERANKER = os.getenv("RERANKER", "llm").lower()
+RERANKERS = ("llm", "cross-encoder")
+
+# Which path produced a ranking, reported back to API clients
+SOURCE_LLM = "llm"                      # fresh LLM ranking
+SOURCE_CACHE = "cache"                  # cached LLM ranking
+SOURCE_CROSS_ENCODER = "cross_encoder"  # local cross-encoder ranking
+SOURCE_VECTOR = "vector"                # vector order (reranker unavailable or returned nothing)
+SOURCE_ERROR = "error"                  # vector order because the reranker call failed
+SOURCE_TIMEOUT = "timeout"              # vector order because the deadline was reached
+SOURCE_DIVERSITY = "diversity"          # diversity stage order, reranker skipped (fast mode)
+
+# One instance per reranker name, so models are loaded only once per process
+_INSTANCES = {}
+
+
+class BaseReranker(ABC):
+    """
+    Interface shared by every reranking stage.
+
+    Subclasses implement rerank_with_source(); rerank() and the async methods
+    are built on it, the async ones running it on the dedicated embedding
+    executor, which suits CPU-bound local models. Every method takes
+    (query, candidates, timeout=None), so callers pass a deadline to any
+    reranker the same way.
+    """
+    name = "base"
+
+    @abstractmethod
+    def rerank_with_source(self, query, candidates, timeout=None):
+        """
+        Rerank synchronously, also reporting which path produced the ranking.
+
+        Args:
+            query (str): The user query
+            candidates (list): Assessment dictionaries from retrieval, best first
+            timeout (float): Seconds the reranker may take, if it supports a limit
+
+        Returns:
+            tuple: (reranked list, source)
+        """
+
+    def rerank(self, query, candidates, timeout=None):
+        """Rerank like rerank_with_source(), returning only the reranked list."""
+        return self.rerank_with_source(query, candidates, timeout=timeout)[0]
+
+    async def arerank(self, query, candidates, timeout=None):
+        """Async version of rerank()."""
+        final_results, _ = await self.arerank_with_source(query, candidates, timeout=timeout)
+        return final_results
+
+    async def arerank_with_source(self, query, candidates, timeout=None):
+        """Async version of rerank_with_source()."""
+        from src.engine.retriever import EMBED_EXECUTOR
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(EMBED_EXECUTOR,
+                                          partial(self.rerank_with_source, query, candidates, timeout=timeout))
+
+
+def get_reranker(name=None):
+    """
+    Return the reranker registered under name, creating it on first use.
+
+    Args:
+        name (str): "llm" or "cross-encoder"; defaults to RERANKER
+
+    Returns:
+        BaseReranker: The shared reranker instance
+    """
+    name = (name or RERANKER).lower()
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{name}'. Expected one of {RERANKERS}.")
+
+    if name not in _INSTANCES:
+        if name == "llm":
+            from src.engine.llm_handler import LLMHandler
+            _INSTANCES[name] = LLMHandler()
+        else:
+            from src.engine.cross_encoder import CrossEncoderReranker
+            _INSTANCES[name] = CrossEncoderReranker()
+
+    return _INSTANCES[name]
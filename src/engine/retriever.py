@@ -1,13 +1,34 @@
-import chromadb
-from chromadb.utils import embedding_functions
-from chromadb.errors import NotFoundError
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from functools import partial
+import asyncio
+import numpy as np
 import os
+import sys
+
+# Add project root to path so the module can also be run as a script
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+from src.engine.cache import embedding_cache, normalize_query
+from src.engine.diversity import DIVERSITY_CANDIDATES, diversify
+from src.engine.filters import FILTER_FIELDS, MetadataFilter, filter_columns
+from src.engine.keyword_index import BM25Index, reciprocal_rank_fusion
+from src.engine.multivector_index import MultiVectorIndex
+from src.engine.numpy_index import NumpyIndex
+from src.engine.query_understanding import (AGGREGATIONS, QUERY_AGGREGATION, QUERY_APPLY_DURATION,
+                                            QUERY_URL_TIMEOUT, aggregate, understand)
+
+# Load environment variables from .env file
+load_dotenv()
 
 # Prefer the DB_PATH declared by vector_store so both modules agree
 try:
-    from src.engine.vector_store import DB_PATH as VECTOR_DB_PATH
+    from src.engine.vector_store import DB_PATH as VECTOR_DB_PATH, EMBEDDING_MODEL
 except Exception:
     VECTOR_DB_PATH = None
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 # Fallback to a package-relative path if vector_store is unavailable
 if VECTOR_DB_PATH:
@@ -15,19 +36,101 @@ if VECTOR_DB_PATH:
 else:
     DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "embeddings", "chroma_db"))
 
-print(f"--- ATTEMPTING TO LOAD DB FROM: {DB_PATH} ---")
 COLLECTION_NAME = "shl_assessments"
 
+# Search backend: "chroma" queries the HNSW index, "numpy" runs exact search in memory,
+# "multivector" scores per-field vectors (name, type labels, description chunks) in memory
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma").lower()
+BACKENDS = ("chroma", "numpy", "multivector")
+
+# Hybrid search fuses dense hits with BM25 keyword hits using Reciprocal Rank Fusion
+RETRIEVER_HYBRID = os.getenv("RETRIEVER_HYBRID", "1").lower() in ("1", "true", "yes")
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# A Chroma collection built before typed metadata was stored is filtered after the query:
+# this many times n_results are fetched first, doubling until enough rows pass
+POST_FILTER_OVERFETCH = int(os.getenv("POST_FILTER_OVERFETCH", "4"))
+
+# Dedicated threads for embedding and search, so async callers never block the event loop
+# and CPU-bound model work does not compete with the server's default threadpool
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+EMBED_EXECUTOR = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+
 
 class Retriever:
     """
     Retriever class for semantic search of SHL assessments.
 
     Uses ChromaDB and sentence transformers to find relevant assessments
-    based on semantic similarity to the query.
+    based on semantic similarity to the query. With the "numpy" backend the
+    snapshot written by vector_store (or, failing that, the collection) is
+    loaded once and searched exactly with NumPy. The "multivector" backend
+    searches the snapshot's per-field vectors with weighted late interaction,
+    falling back to the "numpy" behaviour if the snapshot has none. In hybrid
+    mode the dense hits are fused with BM25 keyword hits over assessment names
+    and descriptions.
+
+    Queries first go through query understanding: long job descriptions are
+    split into chunks that are embedded in one batch and aggregated, URL
+    queries are resolved, and a stated time limit becomes a duration filter.
     """
-    def __init__(self):
-        """Initialize the retriever with ChromaDB and embedding function."""
+    def __init__(self, backend=None, hybrid=None, aggregation=None):
+        """
+        Initialize the retriever with ChromaDB and embedding function.
+
+        Args:
+            backend (str): "chroma", "numpy" or "multivector"; defaults to RETRIEVER_BACKEND
+            hybrid (bool): Fuse dense and keyword results; defaults to RETRIEVER_HYBRID
+            aggregation (str): How chunk vectors of long queries are combined, "mean"
+                               or "max"; defaults to QUERY_AGGREGATION
+        """
+        self.backend = (backend or RETRIEVER_BACKEND).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown retriever backend '{self.backend}'. Expected one of {BACKENDS}.")
+        self.aggregation = (aggregation or QUERY_AGGREGATION).lower()
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown chunk aggregation '{self.aggregation}'. Expected one of {AGGREGATIONS}.")
+
+        # Deferred so importing this module stays cheap; chromadb pulls in the model stack
+        from chromadb.utils import embedding_functions
+
+        # Initialize the embedding function with a sentence transformer model
+        self.embed_func = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=EMBEDDING_MODEL
+        )
+
+        self.client = None
+        self.collection = None
+        self.typed_collection = True
+        self.index = None
+        self._stored_embeddings = {}
+
+        if self.backend == "numpy":
+            # Prefer the memory-mapped snapshot: no database to open and pages shared across workers
+            self.index = NumpyIndex.from_snapshot(model_name=EMBEDDING_MODEL)
+        elif self.backend == "multivector":
+            # Per-field vectors only exist in the snapshot
+            self.index = MultiVectorIndex.from_snapshot(model_name=EMBEDDING_MODEL)
+            if self.index is None:
+                print("No snapshot with per-field vectors found (run vector_store.py); using single-vector search.")
+
+        if self.index is None:
+            self._open_collection()
+
+            # Load the embedding matrix and metadata once for in-process exact search
+            if self.backend != "chroma":
+                self.index = NumpyIndex.from_collection(self.collection)
+
+        # Build the keyword index over the same rows the dense index holds
+        self.keyword_index = None
+        self._records = {}
+        if RETRIEVER_HYBRID if hybrid is None else hybrid:
+            self._build_keyword_index()
+
+    def _open_collection(self):
+        """Connect to the persistent ChromaDB and get (or create) the collection."""
+        import chromadb
+
         # Ensure the DB path exists (Chromadb will create files on write), but warn if missing
         if not os.path.exists(DB_PATH):
             # do not raise here; allow higher-level code to trigger a rebuild from CSV
@@ -36,11 +139,6 @@ class Retriever:
         # Connect to the persistent ChromaDB (explicit named arg for compatibility)
         self.client = chromadb.PersistentClient(path=DB_PATH)
 
-        # Initialize the embedding function with a sentence transformer model
-        self.embed_func = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
-
         # Try to get the collection; if it doesn't exist, attempt to create it (empty) so queries won't fail
         try:
             self.collection = self.client.get_collection(
@@ -58,41 +156,393 @@ class Retriever:
             except Exception as e:
                 raise RuntimeError(f"Failed to get or create Chroma collection: {e}")
 
-    def search(self, query, n_results=15):
+        # Collections indexed before the typed filter fields existed cannot take a `where` clause
+        sample = self.collection.get(limit=1, include=["metadatas"])["metadatas"]
+        self.typed_collection = not sample or all(field in sample[0] for field in FILTER_FIELDS)
+        if not self.typed_collection:
+            print("Collection has no typed filter fields (rebuild it with vector_store.py); "
+                  "filters are applied after the query.")
+
+    def _build_keyword_index(self):
+        """Build the BM25 index and an id -> record lookup for keyword-only hits."""
+        if self.index is not None:
+            ids, documents, metadatas = self.index.ids, self.index.documents, self.index.metadatas
+        else:
+            data = self.collection.get(include=["documents", "metadatas"])
+            ids, documents, metadatas = data["ids"], data["documents"], data["metadatas"]
+
+        self.keyword_index = BM25Index.from_metadatas(ids, metadatas)
+        self._keyword_columns = filter_columns(metadatas)
+        self._records = {
+            doc_id: {"id": doc_id, "document": document, **metadata}
+            for doc_id, document, metadata in zip(ids, documents, metadatas)
+        }
+
+    def embed(self, queries):
+        """
+        Embed a list of queries in a single forward pass.
+
+        Embeddings of previously seen queries come from the query cache; only
+        the misses are sent through the model.
+
+        Args:
+            queries (list): The query strings to embed
+
+        Returns:
+            list: One embedding vector per query
+        """
+        queries = list(queries)
+        keys = [normalize_query(q) for q in queries]
+        embeddings = [embedding_cache.get(key) for key in keys]
+
+        # Embed each distinct missing query once
+        missing = {}
+        for query, key, embedding in zip(queries, keys, embeddings):
+            if embedding is None and key not in missing:
+                missing[key] = query
+
+        if missing:
+            fresh = dict(zip(missing, self.embed_func(list(missing.values()))))
+            for key, embedding in fresh.items():
+                embedding_cache.set(key, embedding)
+            embeddings = [fresh[key] if embedding is None else embedding
+                          for key, embedding in zip(keys, embeddings)]
+
+        return embeddings
+
+    def embed_queries(self, queries):
+        """
+        Run queries through query understanding and embed every chunk in one batch.
+
+        Args:
+            queries (list): The raw query strings
+
+        Returns:
+            tuple: (QueryPlan per query, chunk embedding matrix per query)
+        """
+        plans = [understand(q) for q in queries]
+        return plans, self.embed_plans(plans)
+
+    def embed_plans(self, plans):
+        """
+        Embed the chunks of every plan in one batch.
+
+        Returns:
+            list: Chunk embedding matrix per plan
+        """
+        embeddings = np.asarray(self.embed([chunk for plan in plans for chunk in plan.chunks]), dtype=np.float32)
+        bounds = np.cumsum([0] + [len(plan.chunks) for plan in plans])
+        return [embeddings[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def search(self, query, n_results=15, types=None, max_duration=None, remote=None, adaptive=None):
         """
         Search for assessments matching the query.
 
+        Filters are applied inside the index query, so a filtered search still
+        returns up to n_results matching assessments.
+
         Args:
             query (str): The search query
             n_results (int): Number of results to return
+            types (iterable): Test type codes or labels; results have at least one of them
+            max_duration (int): Longest acceptable duration in minutes
+            remote (bool): Only assessments with remote testing
+            adaptive (bool): Only adaptive (IRT) assessments
 
         Returns:
             list: Ranked list of assessment dictionaries
         """
-        try:
-            # Query the vector database
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+        return self.search_batch([query], n_results=n_results, types=types, max_duration=max_duration,
+                                 remote=remote, adaptive=adaptive)[0]
 
-            # Format the results into a clean list of dictionaries
-            cleaned_results = []
-            for i in range(len(results['ids'][0])):
-                item = {
-                    "id": results['ids'][0][i],
-                    "score": results['distances'][0][i],  # Lower distance = better match
-                    "document": results['documents'][0][i],
-                    **results['metadatas'][0][i]  # Include all metadata fields
-                }
-                cleaned_results.append(item)
+    def search_batch(self, queries, n_results=15, **filters):
+        """
+        Search for assessments matching several queries at once.
+
+        The chunks of all queries are embedded together and sent to the index
+        as one multi-query lookup, which is much cheaper than calling search() in
+        a loop. In hybrid mode each query's dense hits are then fused with its
+        BM25 hits.
 
-            return cleaned_results
+        Args:
+            queries (list): The search queries
+            n_results (int): Number of results to return per query
+            **filters: types, max_duration, remote and adaptive, as for search()
+
+        Returns:
+            list: One ranked list of assessment dictionaries per query
+        """
+        return self.search_with_plans(queries, n_results=n_results, **filters)[1]
+
+    def search_with_plans(self, queries, n_results=15, url_timeout=QUERY_URL_TIMEOUT, **filters):
+        """
+        Like search_batch(), also returning the QueryPlan of every query.
+
+        Query understanding may fetch a posting for a URL query, so callers on
+        the event loop get the plans from here instead of calling understand().
+
+        Args:
+            queries (list): The search queries
+            n_results (int): Number of results to return per query
+            url_timeout (float): Seconds a posting fetch may take (bound it by the request's deadline)
+            **filters: types, max_duration, remote and adaptive, as for search()
+
+        Returns:
+            tuple: (QueryPlan per query, ranked list of assessment dictionaries per query)
+        """
+        queries = list(queries)
+        if not queries:
+            return [], []
+
+        plans = [understand(q, url_timeout=url_timeout) for q in queries]
+        try:
+            # Embed every query's chunks in one batch, then query the index once per filter
+            chunk_embeddings = self.embed_plans(plans)
+            return plans, self.search_prepared(plans, chunk_embeddings, n_results=n_results, **filters)
 
         except Exception as e:
             print(f"Error during retrieval: {e}")
-            return []
+            return plans, [[] for _ in queries]
+
+    def search_prepared(self, plans, chunk_embeddings, n_results=15, **filters):
+        """
+        Rank assessments for queries already through embed_queries().
+
+        A time limit stated in a query is only reported in its plan; with
+        QUERY_APPLY_DURATION it is also applied as the max_duration filter
+        unless the caller passed one. Queries sharing
+        the same filter are searched together.
+
+        Args:
+            plans (list): QueryPlan per query
+            chunk_embeddings (list): Chunk embedding matrix per query
+            n_results (int): Number of results to return per query
+            **filters: types, max_duration, remote and adaptive, as for search()
+
+        Returns:
+            list: One ranked list of assessment dictionaries per query
+        """
+        groups = {}
+        for i, plan in enumerate(plans):
+            max_duration = filters.get("max_duration")
+            if max_duration is None and QUERY_APPLY_DURATION:
+                max_duration = plan.max_duration
+            groups.setdefault(max_duration, []).append(i)
+
+        results = [None] * len(plans)
+        for max_duration, members in groups.items():
+            metadata_filter = MetadataFilter(**{**filters, "max_duration": max_duration})
+            texts = [plans[i].text for i in members]
+            if self.aggregation == "mean":
+                hits = self.search_embedded(texts, [aggregate(chunk_embeddings[i]) for i in members],
+                                            n_results=n_results, metadata_filter=metadata_filter)
+            else:
+                hits = self._search_max_sim(texts, [chunk_embeddings[i] for i in members],
+                                            n_results, metadata_filter)
+            for i, ranked in zip(members, hits):
+                results[i] = ranked
+        return results
+
+    def _search_max_sim(self, texts, chunk_embeddings, n_results, metadata_filter):
+        """
+        Max-sim search: every chunk is searched, and an assessment scores its best chunk distance.
+
+        All chunks of all queries go to the index as one multi-query lookup.
+        """
+        flat = [vector for chunks in chunk_embeddings for vector in chunks]
+        dense = iter(self.search_embeddings(flat, n_results=n_results, metadata_filter=metadata_filter))
+
+        merged = []
+        for chunks in chunk_embeddings:
+            best = {}
+            for _ in range(len(chunks)):
+                for hit in next(dense):
+                    if hit["id"] not in best or hit["score"] < best[hit["id"]]["score"]:
+                        best[hit["id"]] = hit
+            merged.append(sorted(best.values(), key=lambda hit: hit["score"])[:n_results])
+
+        if self.keyword_index is None:
+            return merged
+        keyword_mask = metadata_filter.mask(self._keyword_columns) if metadata_filter else None
+        return [self._fuse(text, hits, n_results, keyword_mask) for text, hits in zip(texts, merged)]
+
+    def search_embedded(self, queries, query_embeddings, n_results=15, metadata_filter=None):
+        """
+        Rank assessments for queries that are already embedded.
+
+        Runs the dense search and, in hybrid mode, fuses each query's dense
+        hits with its BM25 hits. search_batch() is embed() followed by this.
+
+        Args:
+            queries (list): The search queries (used by the keyword index)
+            query_embeddings (list): One embedding per query
+            n_results (int): Number of results to return per query
+            metadata_filter (MetadataFilter): Optional filter applied by both indexes
+
+        Returns:
+            list: One ranked list of assessment dictionaries per query
+        """
+        dense = self.search_embeddings(query_embeddings, n_results=n_results, metadata_filter=metadata_filter)
+        if self.keyword_index is None:
+            return dense
+        keyword_mask = metadata_filter.mask(self._keyword_columns) if metadata_filter else None
+        return [self._fuse(query, hits, n_results, keyword_mask) for query, hits in zip(queries, dense)]
+
+    def _fuse(self, query, dense_hits, n_results, keyword_mask=None):
+        """
+        Fuse dense hits with BM25 hits for the same query using RRF.
+
+        Items keep their dense "score" (None for keyword-only hits) and gain an
+        "rrf_score", higher is better.
+        """
+        keyword_hits = self.keyword_index.search(query, n_results=n_results, mask=keyword_mask)
+        fused = reciprocal_rank_fusion(
+            [[hit["id"] for hit in dense_hits], [doc_id for doc_id, _ in keyword_hits]],
+            k=HYBRID_RRF_K
+        )
+
+        dense_by_id = {hit["id"]: hit for hit in dense_hits}
+        results = []
+        for doc_id, rrf_score in fused[:n_results]:
+            item = dense_by_id.get(doc_id) or {**self._records[doc_id], "score": None}
+            results.append({**item, "rrf_score": rrf_score})
+        return results
+
+    async def asearch(self, query, n_results=15, **filters):
+        """Async version of search(), run on the dedicated embedding executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(EMBED_EXECUTOR, partial(self.search, query, n_results, **filters))
+
+    async def asearch_batch(self, queries, n_results=15, **filters):
+        """Async version of search_batch(), run on the dedicated embedding executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(EMBED_EXECUTOR, partial(self.search_batch, queries, n_results, **filters))
+
+    async def asearch_with_plans(self, queries, n_results=15, url_timeout=QUERY_URL_TIMEOUT, **filters):
+        """Async version of search_with_plans(), run on the dedicated embedding executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(EMBED_EXECUTOR, partial(self.search_with_plans, queries, n_results,
+                                                                  url_timeout=url_timeout, **filters))
+
+    def search_embeddings(self, query_embeddings, n_results=15, metadata_filter=None):
+        """
+        Search the configured backend with precomputed query embeddings.
+
+        Args:
+            query_embeddings (list): One embedding vector per query
+            n_results (int): Number of results to return per query
+            metadata_filter (MetadataFilter): Optional filter, pushed down as a
+                                              Chroma `where` clause or a NumPy row mask
+
+        Returns:
+            list: One ranked list of assessment dictionaries per query
+        """
+        if self.index is not None:
+            return [
+                [self._format_row(row, distance) for row, distance in hits]
+                for hits in self.index.search(query_embeddings, n_results=n_results,
+                                              metadata_filter=metadata_filter)
+            ]
+
+        if metadata_filter and not self.typed_collection:
+            return self._search_post_filtered(query_embeddings, n_results, metadata_filter)
+
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=metadata_filter.where() if metadata_filter else None
+        )
+        return [self._format_results(results, q) for q in range(len(query_embeddings))]
+
+    def _search_post_filtered(self, query_embeddings, n_results, metadata_filter):
+        """
+        Filter Chroma hits in Python, for collections without typed metadata.
+
+        Over-fetches POST_FILTER_OVERFETCH * n_results hits and doubles the
+        fetch until every query has n_results passing hits or the whole
+        collection was searched, so results match a pushed-down filter.
+        """
+        total = self.collection.count()
+        fetch = min(max(n_results * POST_FILTER_OVERFETCH, 1), total)
+        while True:
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=fetch)
+            filtered = []
+            for q in range(len(query_embeddings)):
+                hits = self._format_results(results, q)
+                mask = metadata_filter.mask(filter_columns(hits)) if hits else []
+                filtered.append([hit for hit, keep in zip(hits, mask) if keep][:n_results])
+            if fetch >= total or all(len(hits) == n_results for hits in filtered):
+                return filtered
+            fetch = min(fetch * 2, total)
+
+    def candidate_embeddings(self, ids):
+        """
+        Stored embeddings of assessments, in the order of ids.
+
+        The NumPy backend reads rows of its (memory-mapped) matrix; with Chroma
+        the vectors are fetched once per id and kept, as the catalogue is small.
+
+        Returns:
+            np.ndarray: Matrix of shape (len(ids), dim)
+        """
+        if self.index is not None:
+            rows = [self.index.rows[doc_id] for doc_id in ids]
+            return np.asarray(self.index.embeddings[rows])
+
+        missing = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._stored_embeddings]
+        if missing:
+            data = self.collection.get(ids=missing, include=["embeddings"])
+            self._stored_embeddings.update(zip(data["ids"], np.asarray(data["embeddings"], dtype=np.float32)))
+        return np.stack([self._stored_embeddings[doc_id] for doc_id in ids])
+
+    def diversify(self, results, k=DIVERSITY_CANDIDATES):
+        """
+        Reduce results to k balanced, non-redundant candidates (MMR with skill-group quotas).
+
+        Relevance is taken from the order of results (their fused score when
+        hybrid), so keyword and multi-vector matches keep their standing; the
+        stored embeddings only measure how redundant candidates are.
+
+        Args:
+            results (list): Assessment dictionaries from search(), best first
+            k (int): Number of candidates to keep
+
+        Returns:
+            list: The kept results, most relevant first
+        """
+        if not results or k <= 0:
+            return results
+        embeddings = self.candidate_embeddings([res["id"] for res in results])
+        return diversify(results, embeddings, k=k)
+
+    async def adiversify(self, results, k=DIVERSITY_CANDIDATES):
+        """Async version of diversify(), run on the dedicated embedding executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(EMBED_EXECUTOR, self.diversify, results, k)
+
+    def _format_row(self, row, distance):
+        """Format one row of the in-memory index like a ChromaDB result."""
+        return {
+            "id": self.index.ids[row],
+            "score": distance,  # Lower distance = better match
+            "document": self.index.documents[row],
+            **self.index.metadatas[row]
+        }
+
+    @staticmethod
+    def _format_results(results, q):
+        """Format the ChromaDB results of the q-th query into a clean list of dictionaries."""
+        cleaned_results = []
+        for i in range(len(results['ids'][q])):
+            item = {
+                "id": results['ids'][q][i],
+                "score": results['distances'][q][i],  # Lower distance = better match
+                "document": results['documents'][q][i],
+                **results['metadatas'][q][i]  # Include all metadata fields
+            }
+            cleaned_results.append(item)
 
+        return cleaned_results
 
 if __name__ == "__main__":
     # Test the retriever with a sample query
@@ -103,4 +553,5 @@ if __name__ == "__main__":
     matches = retriever.search(test_query)
 
     for m in matches:
-        print(f" - [{m['score']:.4f}] {m['name']} ({m['test_type']})")
+        score = f"{m['score']:.4f}" if m['score'] is not None else "  kw  "
+        print(f" - [{score}] {m['name']} ({m['test_type']})")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# Snapshots live next to the Chroma database
+SNAPSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "embeddings", "snapshot"))
+MANIFEST_NAME = "manifest.json"
+# Bump when the on-disk layout changes so old readers refuse new files
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_snapshot(ids, embeddings, documents, metadatas, model_name, csv_hash, snapshot_dir=SNAPSHOT_DIR,
+                   fields=None):
+    """
+    Write a versioned, memory-mappable snapshot of the vector index.
+
+    The snapshot consists of a raw float32 .npy matrix of unit-length rows,
+    a columnar .npz metadata file and a manifest. Data files are written under
+    a version-specific name and the manifest is swapped in last, so readers
+    never see a half-written snapshot. Per-field vectors, when given, get a
+    second .npy matrix; their owner rows, field kinds and texts go in the .npz.
+
+    Args:
+        ids (list): Assessment ids, one per row
+        embeddings (array-like): Embedding matrix of shape (n, dim)
+        documents (list): Indexed text, one per row
+        metadatas (list): Metadata dictionaries, one per row
+        model_name (str): Name of the embedding model
+        csv_hash (str): SHA-256 of the source CSV
+        snapshot_dir (str): Directory to write into
+        fields (tuple): Optional (field embeddings, owner rows, field kinds, texts)
+                        from multivector_index.embed_fields
+
+    Returns:
+        dict: The manifest that was written
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+    version = hashlib.sha256(f"{SNAPSHOT_FORMAT_VERSION}:{model_name}:{csv_hash}".encode()).hexdigest()[:12]
+    embeddings_file = f"embeddings-{version}.npy"
+    metadata_file = f"metadata-{version}.npz"
+    fields_file = f"fields-{version}.npy" if fields is not None else None
+
+    # Store metadata column by column rather than as one dict per row
+    columns = sorted({key for meta in metadatas for key in meta})
+    arrays = {
+        "__ids__": np.asarray([str(i) for i in ids]),
+        "__documents__": np.asarray([str(d) for d in documents]),
+    }
+    for column in columns:
+        arrays[column] = np.asarray([meta.get(column, "") for meta in metadatas])
+
+    if fields is not None:
+        field_matrix, field_rows, field_kinds, field_texts = fields
+        field_matrix = np.ascontiguousarray(field_matrix, dtype=np.float32)
+        arrays["__field_rows__"] = np.asarray(field_rows, dtype=np.int32)
+        arrays["__field_kinds__"] = np.asarray(field_kinds, dtype=np.int8)
+        arrays["__field_texts__"] = np.asarray([str(t) for t in field_texts])
+        _atomic_write(os.path.join(snapshot_dir, fields_file), lambda f: np.save(f, field_matrix))
+
+    _atomic_write(os.path.join(snapshot_dir, embeddings_file), lambda f: np.save(f, matrix))
+    _atomic_write(os.path.join(snapshot_dir, metadata_file), lambda f: np.savez_compressed(f, **arrays))
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "version": version,
+        "model_name": model_name,
+        "csv_sha256": csv_hash,
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "embeddings_file": embeddings_file,
+        "metadata_file": metadata_file,
+        "fields_file": fields_file,
+        "columns": columns,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    manifest_bytes = json.dumps(manifest, indent=2).encode("utf-8")
+    _atomic_write(os.path.join(snapshot_dir, MANIFEST_NAME), lambda f: f.write(manifest_bytes))
+
+    # Drop data files of older versions; processes that still map them keep their pages
+    for fname in os.listdir(snapshot_dir):
+        if (fname.startswith(("embeddings-", "metadata-", "fields-"))
+                and fname not in (embeddings_file, metadata_file, fields_file)):
+            try:
+                os.remove(os.path.join(snapshot_dir, fname))
+            except OSError:
+                pass
+
+    return manifest
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """Return the snapshot manifest, or None if there is no usable snapshot."""
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR, model_name=None):
+    """
+    Load a snapshot with its embedding matrix memory-mapped read-only.
+
+    Every process that maps the same file shares one copy of its pages
+    through the OS page cache.
+
+    Args:
+        snapshot_dir (str): Directory holding the snapshot
+        model_name (str): If given, reject snapshots built with another model
+
+    Returns:
+        tuple: (manifest, embeddings, ids, documents, metadatas), or None
+               if no compatible snapshot exists
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        return None
+    if model_name and manifest.get("model_name") != model_name:
+        print(f"Snapshot was built with {manifest.get('model_name')}, expected {model_name}. Ignoring it.")
+        return None
+
+    embeddings = np.load(os.path.join(snapshot_dir, manifest["embeddings_file"]), mmap_mode="r")
+    with np.load(os.path.join(snapshot_dir, manifest["metadata_file"])) as data:
+        ids = data["__ids__"].tolist()
+        documents = data["__documents__"].tolist()
+        columns = {column: data[column].tolist() for column in manifest["columns"]}
+
+    metadatas = [
+        {column: values[row] for column, values in columns.items()}
+        for row in range(len(ids))
+    ]
+    return manifest, embeddings, ids, documents, metadatas
+
+
+def load_fields(snapshot_dir=SNAPSHOT_DIR, manifest=None):
+    """
+    Load the per-field vectors of a snapshot, memory-mapped read-only.
+
+    Args:
+        snapshot_dir (str): Directory holding the snapshot
+        manifest (dict): Manifest already read from snapshot_dir, if any
+
+    Returns:
+        tuple: (field embeddings, owner rows, field kinds, texts), or None if
+               the snapshot was written without per-field vectors
+    """
+    manifest = manifest or read_manifest(snapshot_dir)
+    if manifest is None or not manifest.get("fields_file"):
+        return None
+
+    field_embeddings = np.load(os.path.join(snapshot_dir, manifest["fields_file"]), mmap_mode="r")
+    with np.load(os.path.join(snapshot_dir, manifest["metadata_file"])) as data:
+        return field_embeddings, data["__field_rows__"], data["__field_kinds__"], data["__field_texts__"].tolist()
+
+
+def _atomic_write(path, write):
+    """Write a file through a temporary name and rename it into place."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
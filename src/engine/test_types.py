@@ -0,0 +1,50 @@
+import ast
+
+# SHL test type labels and their one-letter catalogue codes (same as the crawler's TYPE_MAP)
+TYPE_CODES = {
+    'Ability & Aptitude': 'A',
+    'Biodata & Situational Judgement': 'B',
+    'Competencies': 'C',
+    'Development & 360': 'D',
+    'Assessment Exercises': 'E',
+    'Knowledge & Skills': 'K',
+    'Personality & Behavior': 'P',
+    'Simulations': 'S'
+}
+TYPE_LABELS = {code: label for label, code in TYPE_CODES.items()}
+
+
+def parse_test_types(raw):
+    """
+    Parse a test_type value into a list of labels.
+
+    The CSV and the vector store keep test_type as a stringified Python list
+    (e.g. "['Knowledge & Skills']"); lists are returned unchanged.
+
+    Args:
+        raw (str | list): The stored test_type value
+
+    Returns:
+        list: Test type labels
+    """
+    if isinstance(raw, (list, tuple)):
+        return [str(t).strip() for t in raw if str(t).strip()]
+
+    text = str(raw or "").strip()
+    if not text:
+        return []
+    try:
+        parsed = ast.literal_eval(text)
+        if isinstance(parsed, (list, tuple)):
+            return [str(t).strip() for t in parsed if str(t).strip()]
+    except (ValueError, SyntaxError):
+        pass
+
+    # Fall back to a plain comma separated string
+    clean_str = text.replace("[", "").replace("]", "").replace("'", "").replace('"', "")
+    return [t.strip() for t in clean_str.split(",") if t.strip()]
+
+
+def type_codes(raw):
+    """Return the one-letter codes of a test_type value, e.g. "KP"."""
+    return "".join(TYPE_CODES.get(label, "?") for label in parse_test_types(raw))
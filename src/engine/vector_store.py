@@ -1,27 +1,58 @@
+import argparse
+import hashlib
+import json
+import numpy as np
 import pandas as pd
-import chromadb
-from chromadb.errors import NotFoundError
-from chromadb.utils import embedding_functions
 import os
+import sys
+
+# Add project root to path so the module can also be run as a script
+proj_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+from src.engine.cache import invalidate_all
+from src.engine.filters import typed_fields
+from src.engine.multivector_index import embed_fields
+from src.engine.prompt_builder import summarize
+from src.engine.snapshot import SNAPSHOT_DIR, file_sha256, load_fields, read_manifest, write_snapshot
+from src.engine.test_types import parse_test_types
 
 # Paths to data files and database
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "raw", "shl_assessments.csv")
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "embeddings", "chroma_db"))
 COLLECTION_NAME = "shl_assessments"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 
-def initialize_vector_store():
+def initialize_vector_store(incremental=False, delta_path=None):
     """
     Initialize the vector database with assessment data.
 
     Loads assessment data from CSV, creates embeddings using sentence transformers,
-    and stores them in a ChromaDB collection for semantic search.
+    and stores them in a ChromaDB collection for semantic search. The same
+    embeddings are also written as a memory-mappable snapshot for the NumPy backend,
+    together with per-field vectors (name, type labels, description chunks) for
+    the multi-vector backend.
+
+    Args:
+        incremental (bool): Re-embed only new or changed rows and upsert them into
+                            the live collection instead of deleting and rebuilding it
+        delta_path (str): Crawl delta (added/changed/removed URLs) written by the crawler;
+                          an incremental run stops early when it reports no changes
     """
     # Check if data file exists
     if not os.path.exists(DATA_PATH):
         print(f"file not found at {DATA_PATH}")
         return
 
+    if incremental and delta_path and os.path.exists(delta_path):
+        with open(delta_path, "r", encoding="utf-8") as f:
+            delta = json.load(f)
+        if not any(delta.get(key) for key in ("added", "changed", "removed")):
+            print("Crawl delta reports no changes; index is up to date.")
+            return
+
     # Load and clean data
     df = pd.read_csv(DATA_PATH).fillna("")
     print(f"Loaded {len(df)} assessments from CSV. (Preparing to index...)")
@@ -35,7 +66,7 @@ def initialize_vector_store():
         shortened description for better semantic matching.
         """
         name = str(row['name'])
-        test_type = str(','.join(row['test_type']))
+        test_type = ", ".join(parse_test_types(row['test_type']))
         desc = str(row['description'])
 
         # Use only the first part of the description to avoid noise
@@ -47,6 +78,35 @@ def initialize_vector_store():
     # Apply the text transformation to create combined text field
     df["combined_text"] = df.apply(create_focused_text, axis=1)
 
+    # One entry per URL, since ids are derived from it
+    df = df.drop_duplicates(subset="url").reset_index(drop=True)
+
+    # Prepare data for indexing; ids derive from the URL so they stay stable across crawls
+    ids = [stable_id(url) for url in df['url']]
+    documents = df['combined_text'].tolist()
+
+    # Prepare metadata for each assessment
+    metadatas = []
+    for _, row in df.iterrows():
+        metadata = {
+            "name": str(row['name']),
+            "url": str(row['url']),
+            "description": str(row['description']),  # Store full description in metadata
+            "summary": summarize(row['description']),  # Short form used in rerank prompts
+            "duration": str(row['duration']),
+            "test_type": str(row['test_type']),
+            "remote_support": str(row['remote_support']),
+            "adaptive_support": str(row['adaptive_support'])
+        }
+        # Typed copies for filtering inside the index: type_<code> flags, integer
+        # duration (replacing the string) and is_remote / is_adaptive booleans
+        metadata.update(typed_fields(metadata))
+        metadatas.append(metadata)
+
+    # Hash each row's text and metadata so incremental runs can skip unchanged rows
+    for document, metadata in zip(documents, metadatas):
+        metadata["content_hash"] = row_hash(document, metadata)
+
     # Ensure DB directory exists
     try:
         os.makedirs(DB_PATH, exist_ok=True)
@@ -54,6 +114,10 @@ def initialize_vector_store():
         print(f"Could not create DB directory at {DB_PATH}: {e}")
         return
 
+    # chromadb is imported here so modules reading this file's constants stay light
+    import chromadb
+    from chromadb.utils import embedding_functions
+
     # Initialize ChromaDB client and embedding function
     try:
         client = chromadb.PersistentClient(path=DB_PATH)
@@ -62,9 +126,46 @@ def initialize_vector_store():
         return
 
     embed_func = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
+        model_name=EMBEDDING_MODEL
     )
 
+    update = _sync_collection if incremental else _rebuild_collection
+    embeddings = update(client, embed_func, ids, documents, metadatas)
+    if embeddings is None:
+        return
+
+    # Embed every field separately; an incremental run reuses the vectors of unchanged texts
+    try:
+        known = _known_field_vectors() if incremental else None
+        fields = embed_fields(metadatas, embed_func, known=known)
+        print(f"Embedded {len(fields[2])} field vectors for the multi-vector index.")
+    except Exception as e:
+        print(f"Warning: could not embed per-field vectors: {e}")
+        fields = None
+
+    # Write the memory-mappable snapshot next to the database
+    try:
+        manifest = write_snapshot(ids, embeddings, documents, metadatas,
+                                  model_name=EMBEDDING_MODEL, csv_hash=file_sha256(DATA_PATH), fields=fields)
+        print(f"Wrote snapshot {manifest['version']} to {SNAPSHOT_DIR}")
+    except Exception as e:
+        print(f"Warning: could not write embedding snapshot: {e}")
+
+    # Cached embeddings and rankings may refer to the old index
+    invalidate_all()
+
+    print(f"Success! Indexed {len(ids)} items in {DB_PATH}")
+
+
+def _rebuild_collection(client, embed_func, ids, documents, metadatas):
+    """
+    Drop the collection and re-embed every row.
+
+    Returns:
+        list: Embeddings in row order, or None on failure
+    """
+    from chromadb.errors import NotFoundError
+
     # Delete existing collection if it exists to ensure clean data
     try:
         client.delete_collection(name=COLLECTION_NAME)
@@ -82,44 +183,104 @@ def initialize_vector_store():
         )
     except Exception as e:
         print(f"Failed to create collection: {e}")
-        return
+        return None
 
-    # Prepare data for indexing
-    ids = [str(i) for i in range(len(df))]
-    documents = df['combined_text'].tolist()
-
-    # Prepare metadata for each assessment
-    metadatas = []
-    for _, row in df.iterrows():
-        metadatas.append({
-            "name": str(row['name']),
-            "url": str(row['url']),
-            "description": str(row['description']),  # Store full description in metadata
-            "duration": str(row['duration']),
-            "test_type": str(row['test_type']),
-            "remote_support": str(row['remote_support']),
-            "adaptive_support": str(row['adaptive_support'])
-        })
-
-    # Generate embeddings and add to collection
+    # Generate embeddings once so the collection and the snapshot share them
     print("Generating embeddings and indexing... (This may take a while)")
     try:
+        embeddings = embed_func(documents)
         collection.add(
             ids=ids,
             documents=documents,
+            embeddings=embeddings,
             metadatas=metadatas
         )
     except Exception as e:
         print(f"Failed to add documents to collection: {e}")
-        return
+        return None
+
+    return embeddings
+
+
+def _sync_collection(client, embed_func, ids, documents, metadatas):
+    """
+    Bring the live collection in line with the CSV without rebuilding it.
 
+    Only new or changed rows (by content hash) are embedded and upserted, and
+    rows whose URL disappeared are deleted, so readers never see an empty index.
+
+    Returns:
+        list: Embeddings in row order, or None on failure
+    """
     try:
-        count = collection.count()
-    except Exception:
-        count = len(ids)
+        collection = client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            embedding_function=embed_func
+        )
+        existing = collection.get(include=["metadatas", "embeddings"])
+    except Exception as e:
+        print(f"Failed to open collection: {e}")
+        return None
+
+    existing_hashes = {
+        doc_id: (meta or {}).get("content_hash")
+        for doc_id, meta in zip(existing["ids"], existing["metadatas"])
+    }
+    existing_embeddings = dict(zip(existing["ids"], existing["embeddings"]))
+
+    changed = [i for i, doc_id in enumerate(ids) if existing_hashes.get(doc_id) != metadatas[i]["content_hash"]]
+    current_ids = set(ids)
+    removed = [doc_id for doc_id in existing["ids"] if doc_id not in current_ids]
+    print(f"Incremental update: {len(changed)} new or changed, {len(removed)} removed, "
+          f"{len(ids) - len(changed)} unchanged.")
+
+    try:
+        if changed:
+            fresh = embed_func([documents[i] for i in changed])
+            collection.upsert(
+                ids=[ids[i] for i in changed],
+                documents=[documents[i] for i in changed],
+                embeddings=fresh,
+                metadatas=[metadatas[i] for i in changed]
+            )
+            existing_embeddings.update(zip([ids[i] for i in changed], fresh))
+        if removed:
+            collection.delete(ids=removed)
+    except Exception as e:
+        print(f"Failed to update collection: {e}")
+        return None
+
+    return [existing_embeddings[doc_id] for doc_id in ids]
+
+
+def _known_field_vectors():
+    """Field text -> vector from the current snapshot, if it was built with the same model."""
+    manifest = read_manifest()
+    if manifest is None or manifest.get("model_name") != EMBEDDING_MODEL:
+        return {}
+    fields = load_fields(manifest=manifest)
+    if fields is None:
+        return {}
+    field_embeddings, _, _, texts = fields
+    return dict(zip(texts, np.asarray(field_embeddings)))
+
+
+def stable_id(url):
+    """Derive a stable assessment id from its URL."""
+    return hashlib.sha1(str(url).strip().rstrip('/').lower().encode("utf-8")).hexdigest()[:16]
+
 
-    print(f"Success! Indexed {count} items in {DB_PATH}")
+def row_hash(document, metadata):
+    """Hash the indexed text and metadata of a row (excluding the hash itself)."""
+    payload = {key: value for key, value in metadata.items() if key != "content_hash"}
+    return hashlib.sha1(json.dumps([document, payload], sort_keys=True).encode("utf-8")).hexdigest()
 
 
 if __name__ == "__main__":
-    initialize_vector_store()
+    parser = argparse.ArgumentParser(description="Index the assessment catalogue.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upsert new or changed rows and delete removed ones instead of rebuilding")
+    parser.add_argument("--delta", default=None,
+                        help="Crawl delta JSON; with --incremental, skip indexing when it reports no changes")
+    args = parser.parse_args()
+    initialize_vector_store(incremental=args.incremental, delta_path=args.delta)
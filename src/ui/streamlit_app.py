@@ -14,6 +14,7 @@ if project_root not in sys.path:
 try:
     from src.engine.retriever import Retriever
     from src.engine.llm_handler import LLMHandler
+    from src.engine.reranker import get_reranker
     from src.engine.vector_store import initialize_vector_store, DB_PATH
     HAS_ENGINE = True
 except ImportError as e:
@@ -100,9 +101,27 @@ def load_engine():
             return None, None
 
 
+@st.cache_resource
+def load_reranker(name):
+    """
+    Load and cache an alternative reranker (e.g. the local cross-encoder).
+
+    Returns:
+        BaseReranker: The reranker, or None if it could not be loaded
+    """
+    try:
+        return get_reranker(name)
+    except Exception as e:
+        st.warning(f"Failed to load reranker '{name}': {e}")
+        return None
+
+
 # Initialize engine components
 retriever, llm = load_engine()
 
+# Reranker choices shown in the UI and their engine names
+RERANKER_OPTIONS = {"LLM (Gemini)": "llm", "Cross-Encoder (Local)": "cross-encoder"}
+
 # Configure the Streamlit page
 st.set_page_config(page_title="SHL Assessment Finder")
 st.title("SHL ASSESSMENT FINDER")
@@ -132,6 +151,22 @@ with col2:
     st.success(f"Limit: {limit}")
     st.write("")
 
+col3, col4 = st.columns(2)
+
+with col3:
+    max_duration = st.number_input("Max Duration (mins, 0 = any)", min_value=0, max_value=180, value=0, step=5)
+    st.success(f"Max Duration: {max_duration if max_duration else 'Any'}")
+    st.write("")
+
+with col4:
+    remote_only = st.checkbox("Remote testing only")
+    adaptive_only = st.checkbox("Adaptive (IRT) only")
+    st.write("")
+
+reranker_label = st.selectbox("Reranker", list(RERANKER_OPTIONS))
+st.success(f"Reranker: {reranker_label}")
+st.write("")
+
 # Information about the tool
 st.info("""
 **Note:** This tool uses Hybrid Search (Vector + Keywords) to find the best matching SHL assessments for your job description.
@@ -155,19 +190,24 @@ with middle_space:
 
             with st.spinner("Analyzing database..."):
                 if retriever:
-                    # Get initial search results with high recall
-                    results = retriever.search(job_query, n_results=200)
-
-                    # Apply type filter if selected
-                    if test_type != 'All Types':
-                        results = [r for r in results if test_type in str(r.get('test_type', ''))]
-
-                    # Apply LLM reranking if available
-                    if llm:
+                    # Get candidates for reranking; filters are applied inside the index query
+                    results = retriever.search(
+                        job_query, n_results=50,
+                        types=[test_type] if test_type != 'All Types' else None,
+                        max_duration=max_duration or None,
+                        remote=remote_only, adaptive=adaptive_only
+                    )
+                    # Keep a short, balanced and non-redundant candidate list, as the API does
+                    results = retriever.diversify(results)
+
+                    # Apply the selected reranker if available
+                    reranker_name = RERANKER_OPTIONS[reranker_label]
+                    reranker = llm if reranker_name == "llm" else load_reranker(reranker_name)
+                    if reranker:
                         try:
-                            results = llm.rerank(job_query, results)
+                            results = reranker.rerank(job_query, results)
                         except Exception:
-                            pass  # Fallback to vector results if LLM fails
+                            pass  # Fallback to vector results if reranking fails
 
                     # Limit results to user-specified count
                     st.session_state["results"] = results[:limit]
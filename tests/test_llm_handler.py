@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("google.generativeai")
+
+from src.engine import llm_handler
+from src.engine.reranker import SOURCE_TIMEOUT
+
+
+def make_handler(model):
+    """An LLMHandler around a mocked Gemini model, without configuring the API."""
+    handler = llm_handler.LLMHandler.__new__(llm_handler.LLMHandler)
+    handler.model_name = "test-model"
+    handler._llm_slots = asyncio.Semaphore(1)
+    handler.model = model
+    return handler
+
+
+def candidates(n=12):
+    return [{"id": str(i), "name": f"Assessment {i}", "test_type": "Knowledge & Skills",
+             "duration": "10", "description": "A test."} for i in range(n)]
+
+
+class DeadlineExceededTest(unittest.TestCase):
+    """A deadline hit by the Gemini client falls back to vector order, with or without a timeout."""
+
+    def setUp(self):
+        self.error = llm_handler.google_exceptions.DeadlineExceeded("deadline exceeded")
+        self.results = candidates()
+
+    def test_sync_without_timeout(self):
+        model = mock.Mock()
+        model.generate_content.side_effect = self.error
+        final_results, source = make_handler(model).rerank_with_source("sync query", self.results, timeout=None)
+        self.assertEqual(source, SOURCE_TIMEOUT)
+        self.assertEqual(final_results, self.results[:10])
+
+    def test_async_without_timeout(self):
+        model = mock.Mock()
+        model.generate_content_async = mock.AsyncMock(side_effect=self.error)
+        final_results, source = asyncio.run(
+            make_handler(model).arerank_with_source("async query", self.results, timeout=None))
+        self.assertEqual(source, SOURCE_TIMEOUT)
+        self.assertEqual(final_results, self.results[:10])
+
+
+if __name__ == "__main__":
+    unittest.main()